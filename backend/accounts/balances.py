@@ -0,0 +1,180 @@
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Sum, When
+from django.utils import timezone
+
+from .models import Account, BalanceCheckpoint
+
+
+def apply_deltas(deltas):
+    """
+    Apply {account_id: delta} as one UPDATE ... SET balance = balance + delta
+    per account. Accounts are updated in id order so concurrent writers lock
+    rows in the same order. Call inside transaction.atomic.
+    """
+    now = timezone.now()
+    for account_id in sorted(deltas):
+        delta = deltas[account_id]
+        if account_id and delta:
+            Account.objects.filter(pk=account_id).update(
+                balance=F('balance') + delta,
+                updated_at=now
+            )
+
+
+def merge_deltas(*delta_maps):
+    merged = defaultdict(lambda: Decimal('0.00'))
+    for deltas in delta_maps:
+        for account_id, delta in deltas.items():
+            merged[account_id] += delta
+    return merged
+
+
+def shift_checkpoints(dated_deltas):
+    """
+    Apply {(account_id, date): delta} to the balance checkpoints taken on or
+    after each date, for transactions written with a date in the past. In the
+    usual case no such checkpoint exists and this is a single SELECT.
+    Call inside transaction.atomic.
+    """
+    by_account = defaultdict(list)
+    for (account_id, on), delta in dated_deltas.items():
+        if account_id and delta:
+            by_account[account_id].append((on, delta))
+    if not by_account:
+        return
+
+    condition = Q()
+    for account_id, changes in by_account.items():
+        changes.sort()
+        condition |= Q(account_id=account_id, date__gte=changes[0][0])
+
+    # Running totals per account, so each checkpoint takes every change dated on or before it
+    running = {}
+    for account_id, changes in by_account.items():
+        dates, totals, total = [], [], Decimal('0.00')
+        for on, delta in changes:
+            total += delta
+            dates.append(on)
+            totals.append(total)
+        running[account_id] = (dates, totals)
+
+    checkpoints = list(BalanceCheckpoint.objects.select_for_update().filter(condition))
+    for checkpoint in checkpoints:
+        dates, totals = running[checkpoint.account_id]
+        checkpoint.balance += totals[bisect_right(dates, checkpoint.date) - 1]
+    if checkpoints:
+        BalanceCheckpoint.objects.bulk_update(checkpoints, ['balance'])
+
+
+def _net_effects(account_ids, after=None, until=None):
+    """
+    {account_id: net change} from completed transactions dated in
+    (after, until], with the same rules as transactions.models.balance_effect.
+    """
+    from transactions.models import Transaction
+
+    transactions = Transaction.objects.filter(
+        Q(account_id__in=account_ids) | Q(destination_account_id__in=account_ids),
+        status='completed'
+    )
+    if after is not None:
+        transactions = transactions.filter(transaction_date__gt=after)
+    if until is not None:
+        transactions = transactions.filter(transaction_date__lte=until)
+
+    rows = transactions.values('account_id', 'destination_account_id').annotate(
+        net=Sum(Case(
+            When(type='incoming', then=F('amount')),
+            When(type='outgoing', then=-F('amount')),
+            When(type='transfer', destination_account__isnull=False, then=-F('amount')),
+            default=Decimal('0.00')
+        )),
+        transferred=Sum('amount', filter=Q(type='transfer'))
+    ).order_by()
+
+    effects = defaultdict(lambda: Decimal('0.00'))
+    for row in rows:
+        effects[row['account_id']] += row['net'] or 0
+        if row['destination_account_id'] and row['transferred']:
+            effects[row['destination_account_id']] += row['transferred']
+    return effects
+
+
+def balances_as_of(account_ids, on):
+    """
+    {account_id: balance at the end of the day on} for the given accounts.
+    Each balance starts from the account's latest checkpoint on or before
+    that day and adds the transactions since. Accounts without one, and
+    dates from today on, walk back from the current balance instead.
+    Deposits and withdrawals carry no date; they are part of every
+    checkpoint taken after them.
+    """
+    account_ids = list(account_ids)
+    balances = {}
+
+    if on < timezone.now().date():
+        latest = BalanceCheckpoint.objects.filter(
+            account_id=OuterRef('account_id'), date__lte=on
+        ).order_by('-date').values('date')[:1]
+        checkpoints = BalanceCheckpoint.objects.filter(
+            account_id__in=account_ids, date=Subquery(latest)
+        ).values_list('account_id', 'date', 'balance')
+
+        by_date = defaultdict(list)
+        for account_id, checkpoint_date, balance in checkpoints:
+            balances[account_id] = balance
+            by_date[checkpoint_date].append(account_id)
+        # Checkpoints are normally taken for all accounts at once, so this is one query
+        for checkpoint_date, ids in by_date.items():
+            if checkpoint_date < on:
+                effects = _net_effects(ids, after=checkpoint_date, until=on)
+                for account_id in ids:
+                    balances[account_id] += effects.get(account_id, 0)
+
+    remaining = [account_id for account_id in account_ids if account_id not in balances]
+    if remaining:
+        effects = _net_effects(remaining, after=on)
+        for account_id, balance in Account.objects.filter(id__in=remaining).values_list('id', 'balance'):
+            balances[account_id] = balance - effects.get(account_id, 0)
+    return balances
+
+
+def take_checkpoints(on=None, batch_size=1000):
+    """
+    Store every account's balance at the end of the day on (default
+    yesterday), derived from its current balance. Re-taking a checkpoint
+    overwrites it. Returns the number of checkpoints written.
+    """
+    on = on or timezone.now().date() - timedelta(days=1)
+    written = 0
+    last_id = 0
+
+    while True:
+        with db_transaction.atomic():
+            # Locking the accounts holds off transaction writes to them until the checkpoint is stored
+            accounts = list(
+                Account.objects.select_for_update().filter(id__gt=last_id)
+                .order_by('id').values_list('id', 'balance')[:batch_size]
+            )
+            if not accounts:
+                break
+            last_id = accounts[-1][0]
+
+            effects = _net_effects([account_id for account_id, _ in accounts], after=on)
+            BalanceCheckpoint.objects.bulk_create(
+                [
+                    BalanceCheckpoint(account_id=account_id, date=on, balance=balance - effects.get(account_id, 0))
+                    for account_id, balance in accounts
+                ],
+                update_conflicts=True,
+                unique_fields=['account', 'date'],
+                update_fields=['balance']
+            )
+            written += len(accounts)
+
+    return written
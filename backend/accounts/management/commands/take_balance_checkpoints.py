@@ -0,0 +1,24 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.balances import take_checkpoints
+
+
+class Command(BaseCommand):
+    help = 'Store the end-of-day balance of every account, used for as-of-date balances'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Day to checkpoint (YYYY-MM-DD), default yesterday')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        on = None
+        if options['date']:
+            try:
+                on = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid date '{options['date']}', use YYYY-MM-DD.")
+
+        written = take_checkpoints(on=on, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Stored {written} balance checkpoints'))
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.5 on 2026-10-18 01:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BalanceCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("balance", models.DecimalField(decimal_places=2, max_digits=14)),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="checkpoints",
+                        to="accounts.account",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="balancecheckpoint",
+            constraint=models.UniqueConstraint(
+                fields=("account", "date"), name="checkpoint_account_date_uniq"
+            ),
+        ),
+    ]
@@ -29,3 +29,21 @@ class Account(models.Model):
     
     def __str__(self):
         return f"{self.title} ({self.get_type_display()}) - {self.balance}"
+
+class BalanceCheckpoint(models.Model):
+    """
+    An account's balance at the end of a day, taken by the
+    take_balance_checkpoints command. Transactions saved later with an
+    earlier date shift the checkpoints after them, so they stay exact.
+    """
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='checkpoints')
+    date = models.DateField()
+    balance = models.DecimalField(max_digits=14, decimal_places=2)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'date'], name='checkpoint_account_date_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.account_id} @ {self.date}: {self.balance}"
@@ -1,3 +1,105 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
+
+from transactions.models import Transaction
+from .balances import balances_as_of, take_checkpoints
+from .models import Account, BalanceCheckpoint
+
+
+class BalancesAsOfTests(TestCase):
+    """
+    balances_as_of must equal the opening balance plus a plain sum of the
+    completed transactions dated on or before the day, however the
+    transactions were written around the checkpoints.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.now().date()
+        cls.user = User.objects.create_user(username='historian', password='testpass123')
+        cls.checking = Account.objects.create(
+            user=cls.user, title='Checking', type='checking', balance=Decimal('100.00')
+        )
+        cls.savings = Account.objects.create(
+            user=cls.user, title='Savings', type='savings', balance=Decimal('50.00')
+        )
+        cls.opening = {cls.checking.pk: Decimal('100.00'), cls.savings.pk: Decimal('50.00')}
+
+    def day(self, offset):
+        return self.today + timedelta(days=offset)
+
+    def add(self, amount, kind, offset, **fields):
+        fields.setdefault('account', self.checking)
+        return Transaction.objects.create(
+            user=self.user, title=kind, amount=Decimal(amount), type=kind,
+            transaction_date=self.day(offset), **fields
+        )
+
+    def expected_on(self, on):
+        expected = dict(self.opening)
+        for transaction in Transaction.objects.filter(status='completed', transaction_date__lte=on):
+            if transaction.type == 'incoming':
+                expected[transaction.account_id] += transaction.amount
+            elif transaction.type == 'outgoing':
+                expected[transaction.account_id] -= transaction.amount
+            elif transaction.destination_account_id:
+                expected[transaction.account_id] -= transaction.amount
+                expected[transaction.destination_account_id] += transaction.amount
+        return expected
+
+    def assertHistoryMatches(self):
+        # From before the first checkpoint to today, covering every checkpoint boundary
+        for offset in range(-15, 1):
+            on = self.day(offset)
+            with self.subTest(on=on):
+                self.assertEqual(balances_as_of(list(self.opening), on), self.expected_on(on))
+
+    def make_history(self):
+        self.add('40.00', 'incoming', -10)
+        self.add('15.00', 'outgoing', -7)
+        self.add('20.00', 'transfer', -4, destination_account=self.savings)
+        self.add('9.00', 'outgoing', -4, status='pending')
+        self.add('5.00', 'outgoing', 0, account=self.savings)
+        self.assertEqual(take_checkpoints(on=self.day(-6)), 2)
+        self.assertEqual(take_checkpoints(on=self.day(-2)), 2)
+
+    def test_checkpoints_match_plain_sums(self):
+        self.make_history()
+        self.assertEqual(
+            dict(BalanceCheckpoint.objects.filter(date=self.day(-6)).values_list('account_id', 'balance')),
+            self.expected_on(self.day(-6))
+        )
+        self.assertHistoryMatches()
+
+    def test_backdated_transaction_before_a_checkpoint(self):
+        self.make_history()
+        self.add('12.00', 'outgoing', -12)
+        self.add('3.00', 'transfer', -6, account=self.savings, destination_account=self.checking)
+        self.assertHistoryMatches()
+
+    def test_edit_moves_date_across_checkpoints(self):
+        self.make_history()
+        transaction = self.add('25.00', 'incoming', -8)
+
+        transaction.transaction_date = self.day(-1)
+        transaction.save()
+        self.assertHistoryMatches()
+
+        transaction.transaction_date = self.day(-13)
+        transaction.amount = Decimal('30.00')
+        transaction.account = self.savings
+        transaction.save()
+        self.assertHistoryMatches()
+
+    def test_delete_before_checkpoints(self):
+        self.make_history()
+        transaction = self.add('18.00', 'outgoing', -9)
+        transaction.delete()
+        self.assertHistoryMatches()
 
-# Create your tests here.
+        Transaction.objects.filter(transaction_date__lte=self.day(-5)).delete()
+        self.assertHistoryMatches()
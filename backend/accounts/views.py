@@ -1,11 +1,16 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from .models import Account
+from . import balances
 from .serializers import AccountSerializer
+from dashboard.caching import ConditionalGetMixin, bump_data_version, cached_response
 from decimal import Decimal
 
-class AccountViewSet(viewsets.ModelViewSet):
+class AccountViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = AccountSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -26,8 +31,13 @@ class AccountViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        account.balance += amount
-        account.save()
+        # Single UPDATE so concurrent deposits can't overwrite each other
+        Account.objects.filter(pk=account.pk).update(
+            balance=F('balance') + amount,
+            updated_at=timezone.now()
+        )
+        bump_data_version(account.user_id)
+        account.refresh_from_db(fields=['balance', 'updated_at'])
         
         serializer = self.get_serializer(account)
         return Response(serializer.data)
@@ -43,19 +53,48 @@ class AccountViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        if amount > account.balance:
+        # The funds check is part of the UPDATE, so two withdrawals can't both pass it
+        withdrawn = Account.objects.filter(pk=account.pk, balance__gte=amount).update(
+            balance=F('balance') - amount,
+            updated_at=timezone.now()
+        )
+        if not withdrawn:
             return Response(
                 {'error': 'Insufficient funds'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        account.balance -= amount
-        account.save()
+        bump_data_version(account.user_id)
+        account.refresh_from_db(fields=['balance', 'updated_at'])
         
         serializer = self.get_serializer(account)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cached_response
     def total_balance(self, request):
         total = sum(account.balance for account in self.get_queryset())
         return Response({'total_balance': str(total)})
+    
+    @action(detail=False, methods=['get'])
+    @cached_response
+    def balances_as_of(self, request):
+        try:
+            on = parse_date(request.query_params.get('date', ''))
+        except ValueError:
+            on = None
+        if on is None:
+            return Response(
+                {'error': 'date is required, use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        accounts = list(self.get_queryset().order_by('id').values('id', 'title'))
+        as_of = balances.balances_as_of([account['id'] for account in accounts], on)
+        for account in accounts:
+            account['balance'] = str(as_of[account['id']])
+        
+        return Response({
+            'date': on,
+            'accounts': accounts,
+            'total_balance': str(sum(as_of.values(), Decimal('0.00')))
+        })
@@ -0,0 +1,141 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncQuarter, TruncWeek, TruncYear
+
+TRUNC = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'quarter': TruncQuarter,
+    'year': TruncYear,
+}
+GRANULARITIES = tuple(TRUNC)
+
+# Rollup fields behind each group-by dimension: (id, label). The rollup
+# already splits income and expenses, so 'type' needs no column
+DIMENSIONS = {
+    'category': ('category_id', 'category__name'),
+    'account': ('account_id', 'account__title'),
+    'project': ('project_id', 'project__name'),
+    'organization': ('organization_id', 'organization__name'),
+    'type': None,
+}
+
+# Upper bound on the buckets of one series, so gap filling stays small
+MAX_BUCKETS = 1000
+
+
+def bucket_start(day, granularity):
+    """First day of the bucket containing day, matching the database Trunc functions."""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'quarter':
+        return day.replace(month=((day.month - 1) // 3) * 3 + 1, day=1)
+    if granularity == 'year':
+        return day.replace(month=1, day=1)
+    return day
+
+
+def add_buckets(start, granularity, count):
+    """Start of the bucket count buckets after (or before, if negative) the one starting at start."""
+    if granularity == 'day':
+        return start + timedelta(days=count)
+    if granularity == 'week':
+        return start + timedelta(weeks=count)
+
+    months = {'month': 1, 'quarter': 3, 'year': 12}[granularity] * count
+    month = start.month - 1 + months
+    return start.replace(year=start.year + month // 12, month=month % 12 + 1)
+
+
+def bucket_starts(start_date, end_date, granularity):
+    buckets = []
+    current = bucket_start(start_date, granularity)
+    while current <= end_date:
+        buckets.append(current)
+        current = add_buckets(current, granularity, 1)
+    return buckets
+
+
+def _series_of(row, group_by):
+    # Yields (labels, income, expenses) for the series a rollup group belongs to
+    income = row['period_income'] or Decimal('0.00')
+    expenses = row['period_expenses'] or Decimal('0.00')
+    labels = {}
+    for dimension in group_by:
+        if DIMENSIONS[dimension]:
+            id_field, label_field = DIMENSIONS[dimension]
+            labels[dimension] = row[id_field]
+            labels[f'{dimension}_name'] = row[label_field]
+
+    if 'type' not in group_by:
+        yield labels, income, expenses
+        return
+    if income:
+        yield {**labels, 'type': 'incoming'}, income, Decimal('0.00')
+    if expenses:
+        yield {**labels, 'type': 'outgoing'}, Decimal('0.00'), expenses
+
+
+def time_series(rollups, granularity, start_date, end_date, group_by=()):
+    """
+    Income, expenses and net per time bucket from the daily rollup, one
+    series per combination of the group_by dimensions. The rollups are
+    summed with a single query grouped by Trunc(date) and the dimensions;
+    buckets without activity are filled with zeros here.
+    Buckets are labelled by their first day, the first and last may be partial.
+    """
+    fields = [field for dimension in group_by if DIMENSIONS[dimension] for field in DIMENSIONS[dimension]]
+    rows = rollups.filter(
+        date__gte=start_date,
+        date__lte=end_date
+    ).annotate(
+        period=TRUNC[granularity]('date')
+    ).values(
+        'period', *fields
+    ).annotate(
+        period_income=Sum('income'),
+        period_expenses=Sum('expenses')
+    ).order_by()
+
+    buckets = bucket_starts(start_date, end_date, granularity)
+    series = {}
+    if not group_by:
+        # An ungrouped chart always has its one series, even without activity
+        series[()] = {'labels': {}, 'periods': {}}
+    for row in rows:
+        for labels, income, expenses in _series_of(row, group_by):
+            key = tuple(labels.items())
+            entry = series.setdefault(key, {'labels': labels, 'periods': {}})
+            totals = entry['periods'].setdefault(row['period'], [Decimal('0.00'), Decimal('0.00')])
+            totals[0] += income
+            totals[1] += expenses
+
+    results = []
+    for entry in series.values():
+        data = []
+        total_income = total_expenses = Decimal('0.00')
+        for bucket in buckets:
+            income, expenses = entry['periods'].get(bucket, (Decimal('0.00'), Decimal('0.00')))
+            total_income += income
+            total_expenses += expenses
+            data.append({
+                'period': bucket,
+                'income': str(income),
+                'expenses': str(expenses),
+                'net': str(income - expenses)
+            })
+        results.append((total_income + total_expenses, {
+            **entry['labels'],
+            'total_income': str(total_income),
+            'total_expenses': str(total_expenses),
+            'data': data
+        }))
+
+    # Largest series first, which is the order charts and legends want
+    results.sort(key=lambda result: result[0], reverse=True)
+    return buckets, [result for _, result in results]
@@ -0,0 +1,127 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from organizations.visibility import organization_ids_for
+
+
+def _version_key(scope):
+    return f'data-version:{scope}'
+
+
+def _scopes(user_id=None, organization_id=None):
+    scopes = []
+    if user_id:
+        scopes.append(f'user:{user_id}')
+    if organization_id:
+        scopes.append(f'org:{organization_id}')
+    return scopes
+
+
+def bump_data_version(user_id=None, organization_id=None):
+    """
+    Advance the data version of a user and/or organization once the current
+    transaction commits. A missing counter is seeded from the clock, so an
+    evicted counter never repeats a version responses were cached under.
+    """
+    def bump():
+        for scope in _scopes(user_id, organization_id):
+            try:
+                cache.incr(_version_key(scope))
+            except ValueError:
+                cache.set(_version_key(scope), time.time_ns(), None)
+
+    db_transaction.on_commit(bump)
+
+
+def data_versions(user):
+    """Current versions of the user's own data and of every organization they belong to."""
+    organization_ids = organization_ids_for(user)
+    keys = [_version_key(scope) for scope in _scopes(user_id=user.pk)]
+    keys += [_version_key(f'org:{organization_id}') for organization_id in organization_ids]
+
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [(key, versions[key]) for key in keys]
+
+
+def _versioned_digest(endpoint, request, *extra):
+    params = sorted(request.query_params.lists())
+    versions = data_versions(request.user)
+    raw = f'{endpoint}:{request.user.pk}:{params}:{timezone.now().date()}:{versions}:{extra}'
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def response_cache_key(endpoint, request):
+    return 'cached-response:' + _versioned_digest(endpoint, request)
+
+
+def cached_response(view_func):
+    """
+    Cache a read-only view's response data under (endpoint, query params,
+    data versions). Any write to the user's or their organizations' data
+    bumps a version, so a cached response is served until something changes.
+    """
+    endpoint = f'{view_func.__module__}.{view_func.__qualname__}'
+
+    @wraps(view_func)
+    def wrapper(self, request, *args, **kwargs):
+        key = response_cache_key(endpoint, request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = view_func(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60 * 60))
+        return response
+
+    return wrapper
+
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+
+class ConditionalGetMixin:
+    """
+    Strong ETags for GET responses, derived from the same data versions as
+    cached_response plus the URL and rendered media type.
+    A matching If-None-Match is answered with 304 right after
+    authentication, before the handler queries or serializes anything.
+    """
+    etag_exclude_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        self.etag = None
+        if request.method not in ('GET', 'HEAD') or getattr(self, 'action', None) in self.etag_exclude_actions:
+            return
+
+        self.etag = '"%s"' % _versioned_digest(request.build_absolute_uri(), request, request.accepted_media_type)
+        if self.etag in parse_etags(request.headers.get('If-None-Match', '')):
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': self.etag})
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'etag', None) and response.status_code == status.HTTP_200_OK and not response.streaming:
+            response['ETag'] = self.etag
+        return response
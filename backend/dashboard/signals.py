@@ -0,0 +1,73 @@
+from django.apps import apps
+from django.db.models.signals import post_save, post_delete, pre_delete
+
+from .caching import bump_data_version
+
+# Writes that change what the summary endpoints, dashboards and versioned
+# lists return
+VERSIONED_MODELS = (
+    'transactions.Transaction',
+    'transactions.Budget',
+    'transactions.Category',
+    'accounts.Account',
+    'goals.Goal',
+    'organizations.Project',
+)
+
+
+def data_changed(sender, instance, **kwargs):
+    bump_data_version(getattr(instance, 'user_id', None), getattr(instance, 'organization_id', None))
+
+    # A transaction moved to another owner or organization changes the old scope too
+    previous = getattr(instance, '_previous_state', None)
+    if previous:
+        bump_data_version(previous['user_id'], previous['organization_id'])
+
+
+# Personal categories and accounts can be used on organization transactions
+# and budgets, where every member sees their names
+SHARED_REFERENCES = {
+    'transactions.Category': (
+        ('transactions.Transaction', 'category'),
+        ('transactions.Budget', 'category'),
+    ),
+    'accounts.Account': (
+        ('transactions.Transaction', 'account'),
+        ('transactions.Transaction', 'destination_account'),
+    ),
+}
+
+
+def referencing_organization_ids(instance):
+    organization_ids = set()
+    for label, field in SHARED_REFERENCES[instance._meta.label]:
+        organization_ids.update(
+            apps.get_model(label).objects.filter(**{field: instance.pk}, organization__isnull=False)
+            .order_by().values_list('organization_id', flat=True).distinct()
+        )
+    return organization_ids
+
+
+def shared_row_changed(sender, instance, created=False, **kwargs):
+    # Deletes arrive as pre_delete, before cascades and SET_NULL drop the references
+    if created:
+        return
+    for organization_id in referencing_organization_ids(instance):
+        bump_data_version(organization_id=organization_id)
+
+
+def organization_changed(sender, instance, **kwargs):
+    # Organization names are shown on transactions, budgets and categories
+    bump_data_version(organization_id=instance.pk)
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(data_changed, sender=model, dispatch_uid=f'data_version_save_{model}')
+    post_delete.connect(data_changed, sender=model, dispatch_uid=f'data_version_delete_{model}')
+
+for model in SHARED_REFERENCES:
+    post_save.connect(shared_row_changed, sender=model, dispatch_uid=f'data_version_shared_save_{model}')
+    pre_delete.connect(shared_row_changed, sender=model, dispatch_uid=f'data_version_shared_delete_{model}')
+
+post_save.connect(organization_changed, sender='organizations.Organization', dispatch_uid='data_version_save_organization')
+post_delete.connect(organization_changed, sender='organizations.Organization', dispatch_uid='data_version_delete_organization')
@@ -0,0 +1,201 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from accounts.models import Account
+from organizations.models import Organization, OrganizationMember
+from transactions.models import Category, Transaction
+
+
+class SharedDataTestMixin:
+    """An organization whose transactions use the owner's personal category and account."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', password='testpass123')
+        cls.member = User.objects.create_user(username='member', password='testpass123')
+        cls.organization = Organization.objects.create(name='Shared Org', owner=cls.owner)
+        for user, role in ((cls.owner, 'admin'), (cls.member, 'member')):
+            OrganizationMember.objects.create(organization=cls.organization, user=user, role=role)
+
+        cls.account = Account.objects.create(user=cls.owner, title='Owner checking', type='checking')
+        cls.category = Category.objects.create(user=cls.owner, name='Food')
+        cls.transaction = Transaction.objects.create(
+            user=cls.owner, account=cls.account, category=cls.category, organization=cls.organization,
+            title='Team lunch', amount=Decimal('30.00'), type='outgoing'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def write(self, change):
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+
+
+class CachedResponseTests(SharedDataTestMixin, APITestCase):
+    """cached_response serves a stored response until a write bumps a data version it depends on."""
+
+    def summary(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/transactions/summary/', {'period': 'all'})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_write_invalidates_cached_summary(self):
+        self.assertEqual(self.summary(self.member)['expenses'], Decimal('30.00'))
+
+        def add_expense():
+            Transaction.objects.create(
+                user=self.owner, account=self.account, organization=self.organization,
+                title='Coffee', amount=Decimal('5.00'), type='outgoing'
+            )
+        self.write(add_expense)
+        self.assertEqual(self.summary(self.member)['expenses'], Decimal('35.00'))
+
+    def test_owner_rename_reaches_other_members(self):
+        top = self.summary(self.member)['top_expense_categories']
+        self.assertEqual([row['category__name'] for row in top], ['Food'])
+
+        def rename():
+            self.category.name = 'Catering'
+            self.category.save()
+        self.write(rename)
+
+        top = self.summary(self.member)['top_expense_categories']
+        self.assertEqual([row['category__name'] for row in top], ['Catering'])
+
+    def test_owner_delete_reaches_other_members(self):
+        self.assertEqual(self.summary(self.member)['recent_transactions'][0]['title'], 'Team lunch')
+        self.write(self.account.delete)
+        self.assertEqual(self.summary(self.member)['recent_transactions'], [])
+
+
+class ConditionalGetTests(SharedDataTestMixin, APITestCase):
+    """ETags answer 304 until a write the response depends on, then 200 with a new tag."""
+
+    url = '/api/transactions/'
+
+    def get(self, etag=None):
+        self.client.force_authenticate(self.member)
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(self.url, **headers)
+
+    def test_matching_etag_is_not_modified(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_write_gives_a_new_etag(self):
+        etag = self.get()['ETag']
+
+        def edit():
+            self.transaction.title = 'Team dinner'
+            self.transaction.save()
+        self.write(edit)
+
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][0]['title'], 'Team dinner')
+
+    def test_owner_rename_gives_other_members_a_new_etag(self):
+        etag = self.get()['ETag']
+
+        def rename():
+            self.account.title = 'Owner savings'
+            self.account.save()
+        self.write(rename)
+
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['account_name'], 'Owner savings')
+
+
+class AnalyticsTests(APITestCase):
+    """Time buckets come from one grouped rollup query, with empty buckets filled in as zeros."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='analyst', password='testpass123')
+        account = Account.objects.create(user=cls.user, title='Checking', type='checking')
+        cls.food = Category.objects.create(user=cls.user, name='Food')
+        for amount, kind, day, category in (
+            ('10.00', 'outgoing', date(2024, 1, 3), cls.food),
+            ('4.00', 'outgoing', date(2024, 1, 21), None),
+            ('20.00', 'incoming', date(2024, 1, 22), None),
+            ('6.00', 'outgoing', date(2024, 3, 31), cls.food),
+        ):
+            Transaction.objects.create(
+                user=cls.user, account=account, category=category, title=kind,
+                amount=Decimal(amount), type=kind, transaction_date=day
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def get(self, **params):
+        return self.client.get('/api/dashboard/analytics/', params)
+
+    def rows(self, series):
+        return [(str(row['period']), row['income'], row['expenses']) for row in series['data']]
+
+    def test_month_buckets_fill_gaps(self):
+        response = self.get(granularity='month', start_date='2024-01-01', end_date='2024-04-30')
+        self.assertEqual(response.status_code, 200)
+        (series,) = response.data['series']
+        self.assertEqual(self.rows(series), [
+            ('2024-01-01', '20.00', '14.00'),
+            ('2024-02-01', '0.00', '0.00'),
+            ('2024-03-01', '0.00', '6.00'),
+            ('2024-04-01', '0.00', '0.00'),
+        ])
+        self.assertEqual((series['total_income'], series['total_expenses']), ('20.00', '20.00'))
+
+    def test_week_buckets_start_on_monday(self):
+        response = self.get(granularity='week', start_date='2024-01-03', end_date='2024-01-28')
+        self.assertEqual(response.status_code, 200)
+        (series,) = response.data['series']
+        self.assertEqual(self.rows(series), [
+            ('2024-01-01', '0.00', '10.00'),
+            ('2024-01-08', '0.00', '0.00'),
+            ('2024-01-15', '0.00', '4.00'),
+            ('2024-01-22', '20.00', '0.00'),
+        ])
+
+    def test_grouped_series_are_filled_too(self):
+        response = self.get(
+            granularity='month', start_date='2024-01-01', end_date='2024-03-31', group_by='category,type'
+        )
+        self.assertEqual(response.status_code, 200)
+        series = {(row.get('category_name'), row['type']): self.rows(row) for row in response.data['series']}
+        self.assertEqual(series[('Food', 'outgoing')], [
+            ('2024-01-01', '0.00', '10.00'), ('2024-02-01', '0.00', '0.00'), ('2024-03-01', '0.00', '6.00'),
+        ])
+        self.assertEqual(series[(None, 'incoming')], [
+            ('2024-01-01', '20.00', '0.00'), ('2024-02-01', '0.00', '0.00'), ('2024-03-01', '0.00', '0.00'),
+        ])
+        self.assertEqual(len(series), 3)
+
+    def test_bad_parameters_are_rejected(self):
+        for params in (
+            {'start_date': '2024-02-30'},
+            {'start_date': 'yesterday'},
+            {'end_date': '2024-13-01'},
+            {'end_date': 'today'},
+            {'start_date': '2024-03-01', 'end_date': '2024-01-01'},
+            {'granularity': 'hour'},
+            {'group_by': 'colour'},
+            {'granularity': 'day', 'start_date': '2000-01-01', 'end_date': '2024-01-01'},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.get(**params).status_code, 400)
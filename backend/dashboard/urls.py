@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import DashboardView, FinancialSummaryView
+from .views import AnalyticsView, DashboardView, FinancialSummaryView
 
 urlpatterns = [
     path('', DashboardView.as_view(), name='dashboard'),
     path('summary/', FinancialSummaryView.as_view(), name='financial-summary'),
+    path('analytics/', AnalyticsView.as_view(), name='analytics'),
 ]
\ No newline at end of file
@@ -1,95 +1,104 @@
+from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Sum, Count, Q
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.dateparse import parse_date
 from decimal import Decimal
 
 from accounts.models import Account
 from transactions.models import Transaction, Budget
+from transactions.rollups import rollups_for
+from transactions.budgets import resolve_spent
 from goals.models import Goal
+from . import analytics
+from .caching import ConditionalGetMixin, cached_response
 from organizations.models import Organization
+from organizations.visibility import organization_ids_for
 
 
-class DashboardView(APIView):
+class DashboardView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
     
+    @cached_response
     def get(self, request):
         user = request.user
         today = timezone.now().date()
         
-        # Get user's accounts
-        accounts = Account.objects.filter(user=user, is_active=True)
-        total_balance = sum(account.balance for account in accounts)
+        # Get user's accounts, totals and type breakdown in one grouped query
+        account_rows = {
+            row['type']: row for row in Account.objects.filter(
+                user=user, is_active=True
+            ).values('type').annotate(
+                count=Count('id'),
+                total_balance=Sum('balance')
+            ).order_by()
+        }
+        total_balance = sum((row['total_balance'] for row in account_rows.values()), Decimal('0.00'))
+        accounts_count = sum(row['count'] for row in account_rows.values())
         
-        # Get this month's transactions
+        # Get this month's totals from the daily rollup
         start_of_month = today.replace(day=1)
-        monthly_transactions = Transaction.objects.filter(
-            user=user,
-            transaction_date__gte=start_of_month,
-            status='completed'
-        )
+        monthly_rollups = rollups_for(user).filter(date__gte=start_of_month)
         
-        monthly_income = monthly_transactions.filter(type='incoming').aggregate(
-            total=Sum('amount')
-        )['total'] or Decimal('0.00')
-        
-        monthly_expenses = monthly_transactions.filter(type='outgoing').aggregate(
-            total=Sum('amount')
-        )['total'] or Decimal('0.00')
+        monthly_totals = monthly_rollups.aggregate(
+            income=Sum('income'),
+            expenses=Sum('expenses')
+        )
+        monthly_income = monthly_totals['income'] or Decimal('0.00')
+        monthly_expenses = monthly_totals['expenses'] or Decimal('0.00')
         
         # Get recent transactions
         recent_transactions = Transaction.objects.filter(
             user=user
-        ).order_by('-transaction_date')[:5]
+        ).select_related('category', 'account').order_by('-transaction_date')[:5]
         
         # Get goals summary
-        goals = Goal.objects.filter(user=user)
-        goals_summary = {
-            'total': goals.count(),
-            'completed': goals.filter(status='completed').count(),
-            'in_progress': goals.filter(status='in-progress').count(),
-            'pending': goals.filter(status='pending').count(),
-        }
+        goals_summary = Goal.objects.filter(user=user).aggregate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(status='completed')),
+            in_progress=Count('id', filter=Q(status='in-progress')),
+            pending=Count('id', filter=Q(status='pending'))
+        )
         
-        # Get budgets summary
-        budgets = Budget.objects.filter(user=user)
+        # Get budgets summary, current-period spend for all budgets in one query
+        budgets = resolve_spent(Budget.objects.filter(user=user))
         budgets_summary = {
-            'total': budgets.count(),
-            'total_amount': sum(budget.amount for budget in budgets),
-            'total_spent': sum(budget.spent for budget in budgets),
+            'total': len(budgets),
+            'total_amount': sum((budget.amount for budget in budgets), Decimal('0.00')),
+            'total_spent': sum((budget.spent for budget in budgets), Decimal('0.00')),
         }
         
         # Get top expense categories this month
-        top_categories = monthly_transactions.filter(
-            type='outgoing'
+        top_categories = monthly_rollups.filter(
+            expenses__gt=0
         ).values(
             'category__name'
         ).annotate(
-            total=Sum('amount')
+            total=Sum('expenses')
         ).order_by('-total')[:5]
         
         # Get account types breakdown
-        account_breakdown = []
-        for account_type, display_name in Account.ACCOUNT_TYPES:
-            type_accounts = accounts.filter(type=account_type)
-            if type_accounts.exists():
-                account_breakdown.append({
-                    'type': account_type,
-                    'display_name': display_name,
-                    'count': type_accounts.count(),
-                    'total_balance': sum(acc.balance for acc in type_accounts)
-                })
+        account_breakdown = [
+            {
+                'type': account_type,
+                'display_name': display_name,
+                'count': account_rows[account_type]['count'],
+                'total_balance': account_rows[account_type]['total_balance']
+            }
+            for account_type, display_name in Account.ACCOUNT_TYPES
+            if account_type in account_rows
+        ]
         
         # Get organizations count
         organizations_count = Organization.objects.filter(
-            Q(owner=user) | Q(members=user)
-        ).distinct().count()
+            Q(owner=user) | Q(pk__in=organization_ids_for(user))
+        ).count()
         
         return Response({
             'total_balance': str(total_balance),
-            'accounts_count': accounts.count(),
+            'accounts_count': accounts_count,
             'monthly_income': str(monthly_income),
             'monthly_expenses': str(monthly_expenses),
             'monthly_net': str(monthly_income - monthly_expenses),
@@ -133,72 +142,45 @@ class DashboardView(APIView):
         })
 
 
-class FinancialSummaryView(APIView):
+class FinancialSummaryView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
     
+    @cached_response
     def get(self, request):
         user = request.user
         period = request.query_params.get('period', 'month')  # week, month, quarter, year
         
         today = timezone.now().date()
         
-        # Calculate date range based on period
-        if period == 'week':
-            start_date = today - timedelta(days=today.weekday())
-        elif period == 'month':
-            start_date = today.replace(day=1)
-        elif period == 'quarter':
-            month = ((today.month - 1) // 3) * 3 + 1
-            start_date = today.replace(month=month, day=1)
-        elif period == 'year':
-            start_date = today.replace(month=1, day=1)
-        else:
-            start_date = today.replace(day=1)  # default to month
-        
-        # Get transactions for the period
-        transactions = Transaction.objects.filter(
-            user=user,
-            transaction_date__gte=start_date,
-            transaction_date__lte=today,
-            status='completed'
+        # Calculate date range based on period, default to month
+        start_date = analytics.bucket_start(today, period if period in ('week', 'quarter', 'year') else 'month')
+        
+        # Read the period from the daily rollup, one indexed range scan
+        period_rollups = rollups_for(user).filter(
+            date__gte=start_date,
+            date__lte=today
         )
         
-        # Calculate totals
-        income = transactions.filter(type='incoming').aggregate(
-            total=Sum('amount')
-        )['total'] or Decimal('0.00')
-        
-        expenses = transactions.filter(type='outgoing').aggregate(
-            total=Sum('amount')
-        )['total'] or Decimal('0.00')
-        
-        # Get daily breakdown
-        daily_data = []
-        current_date = start_date
-        while current_date <= today:
-            day_transactions = transactions.filter(transaction_date=current_date)
-            day_income = day_transactions.filter(type='incoming').aggregate(
-                total=Sum('amount')
-            )['total'] or Decimal('0.00')
-            day_expenses = day_transactions.filter(type='outgoing').aggregate(
-                total=Sum('amount')
-            )['total'] or Decimal('0.00')
-            
-            daily_data.append({
-                'date': current_date,
-                'income': str(day_income),
-                'expenses': str(day_expenses),
-                'net': str(day_income - day_expenses)
-            })
-            current_date += timedelta(days=1)
+        # Get daily breakdown and totals, filling days without transactions
+        _, (daily,) = analytics.time_series(period_rollups, 'day', start_date, today)
+        income = Decimal(daily['total_income'])
+        expenses = Decimal(daily['total_expenses'])
+        daily_data = [
+            {
+                'date': day['period'],
+                'income': day['income'],
+                'expenses': day['expenses'],
+                'net': day['net']
+            } for day in daily['data']
+        ]
         
         # Get category breakdown
-        category_breakdown = transactions.filter(
-            type='outgoing'
+        category_breakdown = period_rollups.filter(
+            expenses__gt=0
         ).values(
             'category__name'
         ).annotate(
-            total=Sum('amount')
+            total=Sum('expenses')
         ).order_by('-total')
         
         return Response({
@@ -215,4 +197,77 @@ class FinancialSummaryView(APIView):
                     'amount': str(cat['total'])
                 } for cat in category_breakdown
             ]
-        })
\ No newline at end of file
+        })
+
+
+class AnalyticsView(ConditionalGetMixin, APIView):
+    """
+    Income and expenses per day, week, month, quarter or year, optionally
+    split by category, account, project, organization and type. Every
+    chart reads this one grouped rollup query.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    @cached_response
+    def get(self, request):
+        user = request.user
+        today = timezone.now().date()
+        
+        granularity = request.query_params.get('granularity', 'month')
+        if granularity not in analytics.GRANULARITIES:
+            return Response(
+                {'detail': f"granularity must be one of {', '.join(analytics.GRANULARITIES)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        group_by = [dimension.strip() for dimension in request.query_params.get('group_by', '').split(',') if dimension.strip()]
+        unknown = [dimension for dimension in group_by if dimension not in analytics.DIMENSIONS]
+        if unknown:
+            return Response(
+                {'detail': f"Cannot group by {', '.join(unknown)}, use {', '.join(analytics.DIMENSIONS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        group_by = list(dict.fromkeys(group_by))
+        
+        # Defaults to the last 12 buckets up to today. parse_date gives None
+        # for a malformed date and raises ValueError for an impossible one
+        start_param = request.query_params.get('start_date')
+        end_param = request.query_params.get('end_date')
+        try:
+            end_date = parse_date(end_param) if end_param else today
+            start_date = parse_date(start_param) if start_param else None
+        except ValueError:
+            start_date = end_date = None
+        if end_date is not None and not start_param:
+            start_date = analytics.add_buckets(analytics.bucket_start(end_date, granularity), granularity, -11)
+        if start_date is None or end_date is None or start_date > end_date:
+            return Response(
+                {'detail': 'start_date and end_date must be dates (YYYY-MM-DD), start_date first.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        buckets = analytics.bucket_starts(start_date, end_date, granularity)
+        if len(buckets) > analytics.MAX_BUCKETS:
+            return Response(
+                {'detail': f'The range spans more than {analytics.MAX_BUCKETS} buckets, use a coarser granularity.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        analytics_rollups = rollups_for(user, include_organizations=True, organization_ids=organization_ids_for(user))
+        organization_id = request.query_params.get('organization')
+        if organization_id:
+            analytics_rollups = analytics_rollups.filter(organization_id=organization_id)
+        project_id = request.query_params.get('project')
+        if project_id:
+            analytics_rollups = analytics_rollups.filter(project_id=project_id)
+        
+        buckets, series = analytics.time_series(analytics_rollups, granularity, start_date, end_date, group_by)
+        
+        return Response({
+            'granularity': granularity,
+            'group_by': group_by,
+            'start_date': start_date,
+            'end_date': end_date,
+            'buckets': buckets,
+            'series': series
+        })
@@ -0,0 +1,61 @@
+import decimal
+
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # optional, see MessagePackRenderer
+    msgpack = None
+
+_fallback = JSONEncoder()
+
+
+def _default(obj):
+    # Decimals become strings so amounts stay exact, like serializer DecimalFields;
+    # everything else, dates and times included, is converted like DRF does
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    return _fallback.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer on orjson. Output matches the stock renderer
+    except that raw Decimal values are rendered as exact strings rather
+    than floats.
+    """
+    # Raw dates and times go through DRF's encoder, so they come out as the stock renderer writes them
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        options = self.options
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_default, option=options)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    application/msgpack responses, for clients that send that Accept
+    header. Needs the optional msgpack package; settings only register it
+    when it is installed.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # MessagePack has no date or decimal types, _default sends them as JSON would
+        return msgpack.packb(data, default=_default, use_bin_type=True, datetime=False)
+
+
+def msgpack_available():
+    return msgpack is not None
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -173,4 +174,42 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 25,
+    # orjson first so it is the default; MessagePack is added below when installed
+    'DEFAULT_RENDERER_CLASSES': [
+        'finance_project.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
+
+if importlib.util.find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('finance_project.renderers.MessagePackRenderer')
+
+# Report, membership and response caches are invalidated by version bumps
+# from whichever process wrote the data. The local-memory default is only
+# coherent within one process: set REDIS_URL when running several web
+# processes or the report worker (which builds without a local cache).
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Generated financial reports are cached under per-month data versions, so
+# this only bounds how long an unused result stays in the cache
+REPORT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Organization memberships are invalidated whenever they change, this only
+# bounds how long a user's cached memberships can live
+MEMBERSHIP_CACHE_TIMEOUT = 60 * 5
+
+# Summary and dashboard responses are cached under per-user/organization
+# data versions, so this only bounds how long an unused response is kept
+RESPONSE_CACHE_TIMEOUT = 60 * 60
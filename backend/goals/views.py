@@ -2,11 +2,16 @@ from rest_framework import viewsets, permissions, status, filters
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from accounts.models import Account
 from .models import Goal
 from .serializers import GoalSerializer
+from dashboard.caching import ConditionalGetMixin, cached_response
 from decimal import Decimal
 
-class GoalViewSet(viewsets.ModelViewSet):
+class GoalViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = GoalSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -16,7 +21,7 @@ class GoalViewSet(viewsets.ModelViewSet):
     ordering = ['target_date']
     
     def get_queryset(self):
-        return Goal.objects.filter(user=self.request.user)
+        return Goal.objects.filter(user=self.request.user).select_related('linked_account')
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -32,22 +37,25 @@ class GoalViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Update current amount
-        goal.current_amount += amount
-        goal.save()
-        
-        # If linked to an account, update account balance
-        if goal.linked_account and request.data.get('update_account', False):
-            if goal.goal_type == 'savings' or goal.goal_type == 'investment':
-                goal.linked_account.balance -= amount
-            elif goal.goal_type == 'debt':
-                goal.linked_account.balance -= amount
-            goal.linked_account.save()
+        with transaction.atomic():
+            # Update current amount in place, then recompute the status from the stored value
+            Goal.objects.filter(pk=goal.pk).update(current_amount=F('current_amount') + amount)
+            goal.refresh_from_db(fields=['current_amount'])
+            goal.save(update_fields=['status', 'updated_at'])
+            
+            # If linked to an account, update account balance
+            if goal.linked_account_id and request.data.get('update_account', False):
+                # Savings, investment and debt contributions all leave the account
+                Account.objects.filter(pk=goal.linked_account_id).update(
+                    balance=F('balance') - amount,
+                    updated_at=timezone.now()
+                )
             
         serializer = self.get_serializer(goal)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cached_response
     def summary(self, request):
         goals = self.get_queryset()
         
@@ -0,0 +1,64 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import OrganizationMember
+
+# Memo for the request being served by this thread. Outside requests, e.g.
+# in the report worker, there is none and the Django cache is read directly
+_request_memo = threading.local()
+
+
+def _cache_key(user_id):
+    return f'memberships:{user_id}'
+
+
+def start_request_memo(**kwargs):
+    _request_memo.memberships = {}
+
+
+def end_request_memo(**kwargs):
+    _request_memo.memberships = None
+
+
+def memberships_for(user):
+    """
+    {organization id: role} for every organization the user belongs to.
+    Memoized for the current request and cached across requests until a
+    membership of the user changes.
+    """
+    memo = getattr(_request_memo, 'memberships', None)
+    if memo is not None and user.pk in memo:
+        return memo[user.pk]
+
+    key = _cache_key(user.pk)
+    memberships = cache.get(key)
+    if memberships is None:
+        memberships = dict(
+            OrganizationMember.objects.filter(user=user).values_list('organization_id', 'role')
+        )
+        cache.set(key, memberships, getattr(settings, 'MEMBERSHIP_CACHE_TIMEOUT', 60 * 5))
+
+    if memo is not None:
+        memo[user.pk] = memberships
+    return memberships
+
+
+def role_in(user, organization_id):
+    """The user's role in the organization, or None if they are not a member."""
+    try:
+        return memberships_for(user).get(int(organization_id))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_member(user, organization_id):
+    return role_in(user, organization_id) is not None
+
+
+def invalidate_memberships(user_id):
+    memo = getattr(_request_memo, 'memberships', None)
+    if memo is not None:
+        memo.pop(user_id, None)
+    cache.delete(_cache_key(user_id))
@@ -1,6 +1,9 @@
 from django.db import models
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Floor, Least
 from django.contrib.auth.models import User
 from django.utils.text import slugify
+from decimal import Decimal, ROUND_HALF_UP
 
 class Organization(models.Model):
     ORG_TYPES = (
@@ -48,6 +51,37 @@ class OrganizationMember(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.organization.name} ({self.get_role_display()})"
 
+class ProjectQuerySet(models.QuerySet):
+    def with_financials(self):
+        """
+        Annotate budget spent, remaining and percentage in SQL so listing
+        projects needs no per-row queries. The Project budget properties
+        read these annotations when they are present.
+        """
+        from transactions.models import Transaction
+        
+        spent = Transaction.objects.filter(
+            project=OuterRef('pk'),
+            type='outgoing',
+            status='completed'
+        ).order_by().values('project').annotate(
+            total=Sum('amount')
+        ).values('total')
+        
+        money = models.DecimalField(max_digits=12, decimal_places=2)
+        return self.annotate(
+            annotated_spent=Coalesce(Subquery(spent, output_field=money), Value(Decimal('0.00')), output_field=money)
+        ).annotate(
+            annotated_remaining=models.ExpressionWrapper(F('budget') - F('annotated_spent'), output_field=money),
+            # Rounded half up as floor((200 * spent + budget) / (2 * budget)), which
+            # stays exact where SQLite divides integer-valued amounts as integers
+            annotated_percentage=Case(
+                When(budget__lte=0, then=Value(0)),
+                default=Least(Floor((F('annotated_spent') * 200 + F('budget')) / (F('budget') * 2)), Value(100)),
+                output_field=models.IntegerField()
+            )
+        )
+
 class Project(models.Model):
     STATUS_CHOICES = (
         ('planning', 'Planning'),
@@ -70,6 +104,8 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ProjectQuerySet.as_manager()
+    
     def save(self, *args, **kwargs):
         if not self.slug:
             base_slug = slugify(self.name)
@@ -78,24 +114,31 @@ class Project(models.Model):
     
     @property
     def budget_spent(self):
+        if hasattr(self, 'annotated_spent'):
+            return self.annotated_spent
+        
         from transactions.models import Transaction
         spent = Transaction.objects.filter(
             project=self, 
             type='outgoing', 
             status='completed'
-        ).aggregate(models.Sum('amount'))['amount__sum'] or 0
+        ).aggregate(models.Sum('amount'))['amount__sum'] or Decimal('0.00')
         return spent
     
     @property
     def budget_remaining(self):
+        if hasattr(self, 'annotated_remaining'):
+            return self.annotated_remaining
         return self.budget - self.budget_spent
     
     @property
     def budget_percentage(self):
+        if hasattr(self, 'annotated_percentage'):
+            return self.annotated_percentage
         if self.budget <= 0:
             return 0
         percentage = (self.budget_spent / self.budget) * 100
-        return min(round(percentage), 100)
+        return min(int(percentage.quantize(Decimal('1'), rounding=ROUND_HALF_UP)), 100)
     
     def __str__(self):
         return f"{self.name} - {self.organization.name}"
@@ -35,6 +35,9 @@ class OrganizationSerializer(serializers.ModelSerializer):
         read_only_fields = ['slug', 'created_at', 'updated_at']
     
     def get_members_count(self, obj):
+        # Annotated by OrganizationViewSet, counted per object elsewhere
+        if hasattr(obj, 'annotated_members_count'):
+            return obj.annotated_members_count
         return obj.members.count()
 
 class OrganizationDetailSerializer(OrganizationSerializer):
@@ -0,0 +1,20 @@
+from django.core.signals import request_started, request_finished
+from django.db import transaction as db_transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .memberships import start_request_memo, end_request_memo, invalidate_memberships
+from .models import OrganizationMember
+
+
+@receiver(post_save, sender=OrganizationMember)
+@receiver(post_delete, sender=OrganizationMember)
+def membership_changed(sender, instance, **kwargs):
+    # Covers add_member, remove_member, update_member_role, organization
+    # creation and the cascade when an organization is deleted
+    user_id = instance.user_id
+    db_transaction.on_commit(lambda: invalidate_memberships(user_id))
+
+
+request_started.connect(start_request_memo, dispatch_uid='memberships_request_started')
+request_finished.connect(end_request_memo, dispatch_uid='memberships_request_finished')
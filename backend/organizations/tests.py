@@ -1,3 +1,160 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from accounts.models import Account
+from transactions.models import Transaction
+from .memberships import memberships_for, role_in
+from .models import Organization, OrganizationMember, Project
+from .visibility import visible_to
+
+
+class ProjectFinancialsTests(TestCase):
+    """with_financials() must give the same figures as the per-project properties."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='manager', password='testpass123')
+        cls.account = Account.objects.create(user=cls.user, title='Checking', type='checking')
+        cls.organization = Organization.objects.create(name='Finance Org', owner=cls.user)
+
+        # (budget, spent): integer-valued and fractional amounts, an exact half,
+        # overspending, a zero budget and a project without expenses
+        for budget, spent in (
+            ('300.00', '200.00'), ('300.00', '200.50'), ('100.00', '62.50'),
+            ('80.00', '100.00'), ('0.00', '5.00'), ('3.00', '1.00'), ('50.00', None),
+        ):
+            project = Project.objects.create(
+                name=f'Project {budget} {spent}', organization=cls.organization,
+                start_date=timezone.now().date(), budget=Decimal(budget)
+            )
+            if spent:
+                Transaction.objects.create(
+                    user=cls.user, account=cls.account, organization=cls.organization, project=project,
+                    title='Spend', amount=Decimal(spent), type='outgoing'
+                )
+
+    def test_annotations_match_properties(self):
+        for annotated in Project.objects.with_financials():
+            project = Project.objects.get(pk=annotated.pk)
+            with self.subTest(project=project.name):
+                self.assertIsInstance(annotated.budget_spent, Decimal)
+                self.assertIsInstance(annotated.budget_remaining, Decimal)
+                self.assertEqual(annotated.budget_spent, project.budget_spent)
+                self.assertEqual(annotated.budget_remaining, project.budget_remaining)
+                self.assertEqual(annotated.budget_percentage, project.budget_percentage)
+
+    def test_percentage_rounds_half_up(self):
+        percentages = dict(Project.objects.with_financials().values_list('name', 'annotated_percentage'))
+        self.assertEqual(percentages['Project 300.00 200.00'], 67)
+        self.assertEqual(percentages['Project 100.00 62.50'], 63)
+        self.assertEqual(percentages['Project 80.00 100.00'], 100)
+        self.assertEqual(percentages['Project 0.00 5.00'], 0)
+
+
+class MembershipCacheTests(APITestCase):
+    """Cached memberships and roles follow members being added, changed and removed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='org-owner', password='testpass123')
+        cls.user = User.objects.create_user(username='joiner', password='testpass123')
+        cls.organization = Organization.objects.create(name='Cached Org', owner=cls.owner)
+        OrganizationMember.objects.create(organization=cls.organization, user=cls.owner, role='admin')
+        cls.url = f'/api/organizations/organizations/{cls.organization.id}/'
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.owner)
+
+    def request(self, method, action, data):
+        # Invalidation runs on commit, which the test transaction never reaches
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(self.url + action + '/', data, format='json')
+        self.assertLess(response.status_code, 300, response.data)
+
+    def test_add_change_and_remove_member(self):
+        # Cache the user's memberships before each change
+        self.assertEqual(memberships_for(self.user), {})
+
+        self.request('post', 'add_member', {'user_id': self.user.id, 'role': 'viewer'})
+        self.assertEqual(role_in(self.user, self.organization.id), 'viewer')
+
+        self.request('patch', 'update_member_role', {'user_id': self.user.id, 'role': 'manager'})
+        self.assertEqual(role_in(self.user, self.organization.id), 'manager')
+
+        self.request('delete', 'remove_member', {'user_id': self.user.id})
+        self.assertIsNone(role_in(self.user, self.organization.id))
+
+    def test_adding_an_existing_member_is_refused(self):
+        self.request('post', 'add_member', {'user_id': self.user.id})
+        response = self.client.post(self.url + 'add_member/', {'user_id': self.user.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class VisibilityTests(APITestCase):
+    """visible_to returns a user's own rows and their organizations' rows, nothing else."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = User.objects.create_user(username='insider', password='testpass123')
+        cls.colleague = User.objects.create_user(username='colleague', password='testpass123')
+        cls.outsider = User.objects.create_user(username='outsider', password='testpass123')
+        cls.stranger = User.objects.create_user(username='stranger', password='testpass123')
+
+        cls.organization = Organization.objects.create(name='Inner Org', owner=cls.colleague)
+        other_organization = Organization.objects.create(name='Other Org', owner=cls.stranger)
+        for organization, user in (
+            (cls.organization, cls.member), (cls.organization, cls.colleague), (other_organization, cls.stranger),
+        ):
+            OrganizationMember.objects.create(organization=organization, user=user, role='member')
+
+        def add(user, title, organization=None):
+            account = Account.objects.create(user=user, title=f'{title} account', type='checking')
+            return Transaction.objects.create(
+                user=user, account=account, organization=organization, title=title,
+                amount=Decimal('1.00'), type='outgoing'
+            )
+
+        cls.personal = add(cls.member, 'Personal')
+        cls.shared = add(cls.colleague, 'Shared', cls.organization)
+        cls.colleague_personal = add(cls.colleague, 'Colleague personal')
+        cls.other = add(cls.stranger, 'Other org', other_organization)
+
+    def setUp(self):
+        cache.clear()
+
+    def visible_titles(self, user):
+        return sorted(visible_to(Transaction.objects.all(), user).values_list('title', flat=True))
+
+    def test_members_see_own_and_organization_rows(self):
+        self.assertEqual(self.visible_titles(self.member), ['Personal', 'Shared'])
+        # A personal row stays private from the owner's fellow members
+        self.assertEqual(self.visible_titles(self.colleague), ['Colleague personal', 'Shared'])
+
+    def test_member_of_another_organization(self):
+        self.assertEqual(self.visible_titles(self.stranger), ['Other org'])
+
+    def test_non_member_sees_only_own_rows(self):
+        self.assertEqual(self.visible_titles(self.outsider), [])
+
+    def test_api_hides_other_rows(self):
+        self.client.force_authenticate(self.outsider)
+        for transaction in (self.personal, self.shared, self.other):
+            with self.subTest(title=transaction.title):
+                response = self.client.get(f'/api/transactions/{transaction.id}/')
+                self.assertEqual(response.status_code, 404)
+
+        self.client.force_authenticate(self.member)
+        response = self.client.get('/api/transactions/')
+        self.assertEqual(sorted(row['title'] for row in response.data['results']), ['Personal', 'Shared'])
 
-# Create your tests here.
+    def test_leaving_the_organization_hides_its_rows(self):
+        self.assertEqual(self.visible_titles(self.member), ['Personal', 'Shared'])
+        with self.captureOnCommitCallbacks(execute=True):
+            OrganizationMember.objects.filter(user=self.member).delete()
+        self.assertEqual(self.visible_titles(self.member), ['Personal'])
@@ -4,6 +4,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Organization, OrganizationMember, Project
+from .memberships import is_member, role_in
+from .visibility import organization_ids_for
 from .serializers import (
     OrganizationSerializer, 
     OrganizationDetailSerializer,
@@ -11,7 +13,7 @@ from .serializers import (
     ProjectSerializer,
     ProjectDetailSerializer
 )
-from django.db.models import Q
+from django.db.models import Count, Q
 
 class OrganizationViewSet(viewsets.ModelViewSet):
     queryset = Organization.objects.all()
@@ -25,9 +27,12 @@ class OrganizationViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         # Return organizations where user is owner or member
-        return Organization.objects.filter(
-            Q(owner=user) | Q(members=user)
-        ).distinct()
+        organizations = Organization.objects.filter(
+            Q(owner=user) | Q(pk__in=organization_ids_for(user))
+        ).select_related('owner').annotate(annotated_members_count=Count('members'))
+        if self.action == 'retrieve':
+            return organizations.prefetch_related('organizationmember_set__user')
+        return organizations
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -52,7 +57,7 @@ class OrganizationViewSet(viewsets.ModelViewSet):
         if serializer.is_valid():
             # Check if user is already a member
             user = serializer.validated_data['user']
-            if organization.members.filter(id=user.id).exists():
+            if role_in(user, organization.pk) is not None:
                 return Response(
                     {'detail': 'User is already a member of this organization.'},
                     status=status.HTTP_400_BAD_REQUEST
@@ -133,11 +138,15 @@ class ProjectViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         # Return projects where user is manager, team member, or part of the organization
-        return Project.objects.filter(
+        team_projects = Project.team_members.through.objects.filter(user=user).values('project_id')
+        projects = Project.objects.filter(
             Q(manager=user) | 
-            Q(team_members=user) | 
-            Q(organization__members=user)
-        ).distinct()
+            Q(pk__in=team_projects) | 
+            Q(organization_id__in=organization_ids_for(user))
+        ).select_related('organization', 'manager').with_financials()
+        if self.action == 'retrieve':
+            return projects.prefetch_related('team_members')
+        return projects
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -155,16 +164,17 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        from django.contrib.auth.models import User
+        user = get_object_or_404(User, id=user_id)
+        
         # Check if user is part of the organization
-        if not project.organization.members.filter(id=user_id).exists():
+        if not is_member(user, project.organization_id):
             return Response(
                 {'detail': 'User must be a member of the organization.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         # Add user to team members
-        from django.contrib.auth.models import User
-        user = get_object_or_404(User, id=user_id)
         project.team_members.add(user)
         
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class TransactionsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "transactions"
+
+    def ready(self):
+        from .search import ensure_sqlite_triggers
+        from . import signals  # noqa: F401
+
+        post_migrate.connect(ensure_sqlite_triggers, sender=self)
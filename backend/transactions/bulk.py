@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+
+from accounts.balances import apply_deltas, shift_checkpoints
+from dashboard.caching import bump_data_version
+from . import rollups, report_cache
+from .models import Transaction, balance_effect, dated_balance_effect
+from .tags import attach_many
+
+BATCH_SIZE = 1000
+
+
+class BulkTransactionWriter:
+    """
+    Bulk inserts or deletes transactions and defers what Transaction.save
+    and delete do per row until finish(): one balance update per account,
+    one rollup write per rollup row and one cache invalidation per owner.
+    Must be used inside an atomic block.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.deltas = {}
+        self.dated_deltas = {}
+        self.rollup_totals = {}
+        # (user id, organization id) -> months touched
+        self.months = {}
+
+    def insert(self, transactions):
+        Transaction.objects.bulk_create(transactions, batch_size=self.batch_size)
+        attach_many(transactions)
+
+        self._track([rollups.snapshot(transaction) for transaction in transactions], 1)
+        return len(transactions)
+
+    def remove(self, states, with_rollups=True):
+        """
+        Take out the effects of transactions about to be deleted, given their
+        stored rollups.ROLLUP_FIELDS. Pass with_rollups=False when a cascade
+        deletes their rollup rows anyway.
+        """
+        self._track(states, -1, with_rollups)
+        return len(states)
+
+    def _track(self, states, sign, with_rollups=True):
+        if with_rollups:
+            rollups.accumulate(states, self.rollup_totals, sign)
+        for state in states:
+            for account_id, delta in balance_effect(state).items():
+                self.deltas[account_id] = self.deltas.get(account_id, Decimal('0.00')) + sign * delta
+            for key, delta in dated_balance_effect(state, sign).items():
+                self.dated_deltas[key] = self.dated_deltas.get(key, Decimal('0.00')) + delta
+            scope = (state['user_id'], state['organization_id'])
+            self.months.setdefault(scope, set()).add(f"{state['transaction_date']:%Y-%m}")
+
+    def finish(self):
+        apply_deltas(self.deltas)
+        shift_checkpoints(self.dated_deltas)
+        rollups.apply_totals(self.rollup_totals)
+
+        for (user_id, organization_id), months in self.months.items():
+            scopes = report_cache.scopes_for(user_id, organization_id)
+            months = sorted(months)
+            db_transaction.on_commit(lambda scopes=scopes, months=months: report_cache.bump(scopes, months))
+            # bulk_create sends no post_save, so bump the data version here
+            bump_data_version(user_id, organization_id)
+
+        self.deltas = {}
+        self.dated_deltas = {}
+        self.rollup_totals = {}
+        self.months = {}
@@ -0,0 +1,139 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connections, models
+
+from accounts.balances import balances_as_of
+from accounts.models import Account
+
+CENT = Decimal('0.01')
+
+# Completed flows of the report's transactions per account and day, in cents
+# so sums stay exact on every backend. A transfer is an outflow of its source
+# account and an inflow of its destination; the consolidated series leaves
+# out transfers between two of the report's accounts, which move no money in
+# or out of the set.
+FLOWS_SQL = """
+WITH scoped AS (
+    SELECT account_id, destination_account_id, transaction_date, type,
+           CAST(ROUND(amount * 100) AS BIGINT) AS cents
+    FROM {table}
+    WHERE status = 'completed' AND id IN ({transactions})
+),
+flows AS (
+    SELECT account_id AS flow_account, transaction_date AS day,
+           CASE WHEN type = 'incoming' THEN cents ELSE 0 END AS inflow,
+           CASE WHEN type = 'outgoing' THEN cents
+                WHEN type = 'transfer' AND destination_account_id IS NOT NULL {external_destination} THEN cents
+                ELSE 0 END AS outflow
+    FROM scoped
+    WHERE account_id IN ({accounts})
+    UNION ALL
+    SELECT destination_account_id, transaction_date, cents, 0
+    FROM scoped
+    WHERE type = 'transfer' AND destination_account_id IN ({accounts}) {external_source}
+)
+SELECT {group}, SUM(inflow), SUM(outflow),
+       SUM(SUM(inflow) - SUM(outflow)) OVER ({partition}ORDER BY day)
+FROM flows
+GROUP BY {group}
+HAVING SUM(inflow) <> 0 OR SUM(outflow) <> 0
+ORDER BY {group}
+"""
+
+_date_field = models.DateField()
+
+
+def _amount(cents):
+    return (Decimal(cents) / 100).quantize(CENT)
+
+
+def _series(transactions, account_ids, per_account):
+    """Rows of (account_id or None, day, inflow, outflow, running net) from one windowed query."""
+    connection = connections[transactions.db]
+    transactions_sql, transactions_params = transactions.order_by().values('id').query.sql_with_params()
+    accounts = ', '.join(['%s'] * len(account_ids))
+
+    if per_account:
+        group, partition = 'flow_account, day', 'PARTITION BY flow_account '
+        external_destination = external_source = ''
+        params = [*transactions_params, *account_ids, *account_ids]
+    else:
+        group, partition = 'day', ''
+        external_destination = f'AND destination_account_id NOT IN ({accounts})'
+        external_source = f'AND account_id NOT IN ({accounts})'
+        params = [*transactions_params, *account_ids, *account_ids, *account_ids, *account_ids]
+
+    sql = FLOWS_SQL.format(
+        table=connection.ops.quote_name(transactions.model._meta.db_table),
+        transactions=transactions_sql,
+        accounts=accounts,
+        external_destination=external_destination,
+        external_source=external_source,
+        group=group,
+        partition=partition
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for row in cursor:
+            if not per_account:
+                row = (None, *row)
+            account_id, day, inflow, outflow, running = row
+            yield account_id, _date_field.to_python(day), _amount(inflow), _amount(outflow), _amount(running)
+
+
+def _point(day, inflow, outflow, balance):
+    return {
+        'date': day,
+        'inflow': inflow,
+        'outflow': outflow,
+        'net': inflow - outflow,
+        'balance': balance
+    }
+
+
+def cash_flow(transactions, account_ids, start_date, seed_balances=True, listed_account_ids=None):
+    """
+    Daily inflow, outflow and running balance of the given accounts over the
+    transactions in the queryset, consolidated and per account. Balances are
+    seeded with the accounts' balances at the end of the day before
+    start_date, or start at zero with seed_balances=False; running totals
+    are window sums in the database, so each series is one query returning
+    one row per day with activity. Only the accounts in listed_account_ids,
+    when given, get a per-account series.
+    """
+    account_ids = sorted(set(account_ids))
+    listed_ids = account_ids if listed_account_ids is None else sorted(set(listed_account_ids) & set(account_ids))
+    if seed_balances:
+        starting = balances_as_of(account_ids, start_date - timedelta(days=1))
+    else:
+        starting = dict.fromkeys(account_ids, Decimal('0.00'))
+    starting_balance = sum(starting.values(), Decimal('0.00'))
+
+    consolidated = []
+    accounts = {
+        account['id']: {
+            'account_id': account['id'],
+            'title': account['title'],
+            'starting_balance': starting[account['id']],
+            'ending_balance': starting[account['id']],
+            'cash_flow': []
+        }
+        for account in Account.objects.filter(id__in=listed_ids).order_by('id').values('id', 'title')
+    }
+
+    if account_ids:
+        for _, day, inflow, outflow, running in _series(transactions, account_ids, per_account=False):
+            consolidated.append(_point(day, inflow, outflow, starting_balance + running))
+    if listed_ids:
+        for account_id, day, inflow, outflow, running in _series(transactions, listed_ids, per_account=True):
+            series = accounts[account_id]
+            series['ending_balance'] = series['starting_balance'] + running
+            series['cash_flow'].append(_point(day, inflow, outflow, series['ending_balance']))
+
+    return {
+        'cash_flow': consolidated,
+        'starting_balance': starting_balance,
+        'ending_balance': consolidated[-1]['balance'] if consolidated else starting_balance,
+        'accounts': list(accounts.values())
+    }
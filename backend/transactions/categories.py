@@ -0,0 +1,99 @@
+from django.db.models import Sum
+
+
+def link_new(category):
+    """Create the closure rows of a just-created category: itself and every ancestor of its parent."""
+    from .models import CategoryClosure
+
+    links = [CategoryClosure(ancestor_id=category.pk, descendant_id=category.pk, depth=0)]
+    if category.parent_id:
+        links += [
+            CategoryClosure(ancestor_id=ancestor_id, descendant_id=category.pk, depth=depth + 1)
+            for ancestor_id, depth in CategoryClosure.objects.filter(
+                descendant_id=category.parent_id
+            ).values_list('ancestor_id', 'depth')
+        ]
+    CategoryClosure.objects.bulk_create(links)
+
+
+def is_descendant(category_id, ancestor_id):
+    """True when category_id is ancestor_id or lies below it."""
+    from .models import CategoryClosure
+
+    return CategoryClosure.objects.filter(ancestor_id=ancestor_id, descendant_id=category_id).exists()
+
+
+def _subtree(category):
+    from .models import CategoryClosure
+
+    return list(CategoryClosure.objects.filter(ancestor_id=category.pk).values_list('descendant_id', 'depth'))
+
+
+def move(category, subtree=None):
+    """
+    Re-link a category and everything below it after its parent changed:
+    drop the links to its old ancestors and add the new parent's.
+    """
+    from .models import CategoryClosure
+
+    subtree = subtree if subtree is not None else _subtree(category)
+    ids = [descendant_id for descendant_id, _ in subtree]
+    CategoryClosure.objects.filter(descendant_id__in=ids).exclude(ancestor_id__in=ids).delete()
+
+    if category.parent_id:
+        ancestors = CategoryClosure.objects.filter(descendant_id=category.parent_id).values_list('ancestor_id', 'depth')
+        CategoryClosure.objects.bulk_create([
+            CategoryClosure(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=ancestor_depth + depth + 1)
+            for ancestor_id, ancestor_depth in ancestors
+            for descendant_id, depth in subtree
+        ])
+
+
+def detach_children(category):
+    """Before a category is deleted, make its subcategories roots like the SET_NULL on parent does."""
+    from .models import CategoryClosure
+
+    below = [(descendant_id, depth) for descendant_id, depth in _subtree(category) if descendant_id != category.pk]
+    ids = [descendant_id for descendant_id, _ in below]
+    CategoryClosure.objects.filter(descendant_id__in=ids).exclude(ancestor_id__in=ids).delete()
+
+
+def build_tree(categories):
+    """
+    Nest category dicts (with 'id' and 'parent' keys) under their parents.
+    Categories whose parent is not in the list become roots.
+    """
+    nodes = {category['id']: {**category, 'subcategories': []} for category in categories}
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node['parent'])
+        (parent['subcategories'] if parent else roots).append(node)
+    return roots
+
+
+def spend_by_ancestor(queryset, amount='amount', category_field='category', top_level=False):
+    """
+    Sum amount per category including everything filed under its
+    subcategories, in one join through the category closure table. Every
+    ancestor of a row's category gets the row's amount, so parents total
+    their subtree. With top_level, only root categories are returned and
+    each row counts once. Uncategorized rows are left out.
+    """
+    ancestor = f'{category_field}__ancestor_links__ancestor'
+    rows = queryset.order_by()
+    if top_level:
+        rows = rows.filter(**{f'{ancestor}__parent__isnull': True})
+    rows = rows.values(
+        f'{ancestor}_id', f'{ancestor}__name', f'{ancestor}__parent_id'
+    ).annotate(
+        total=Sum(amount)
+    ).order_by('-total', f'{ancestor}__name')
+
+    return [
+        {
+            'category_id': row[f'{ancestor}_id'],
+            'category__name': row[f'{ancestor}__name'],
+            'parent_id': row[f'{ancestor}__parent_id'],
+            'total': row['total']
+        } for row in rows if row[f'{ancestor}_id'] is not None
+    ]
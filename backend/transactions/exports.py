@@ -0,0 +1,189 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Transaction
+
+# (CSV header, field name, queryset lookup) for every exported column, in output order
+EXPORT_COLUMNS = (
+    ('Date', 'transaction_date', 'transaction_date'),
+    ('Title', 'title', 'title'),
+    ('Amount', 'amount', 'amount'),
+    ('Type', 'type', 'type'),
+    ('Category', 'category', 'category__name'),
+    ('Account', 'account', 'account__title'),
+    ('Status', 'status', 'status'),
+    ('Description', 'description', 'description'),
+    ('Organization', 'organization', 'organization__name'),
+    ('Project', 'project', 'project__name'),
+    ('Reference', 'reference_number', 'reference_number'),
+)
+
+# Machine-readable formats also carry the transaction id
+FIELD_NAMES = ('id',) + tuple(name for _, name, _ in EXPORT_COLUMNS)
+
+CHUNK_SIZE = 2000
+
+TYPE_LABELS = dict(Transaction.TRANSACTION_TYPES)
+STATUS_LABELS = dict(Transaction.STATUS_CHOICES)
+
+
+class Echo:
+    """File-like object that hands each written line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+class ChunkBuffer:
+    """Write-only file-like object whose contents are drained after every batch."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def export_values(transactions, chunk_size=CHUNK_SIZE):
+    """
+    Yield raw export rows as tuples in FIELD_NAMES order, reading the
+    queryset in chunks through a server-side cursor. Related names are
+    joined in the same query.
+    """
+    return transactions.values_list(
+        'id', *(lookup for _, _, lookup in EXPORT_COLUMNS)
+    ).iterator(chunk_size=chunk_size)
+
+
+def export_batches(transactions, chunk_size=CHUNK_SIZE):
+    """Group export_values into lists of at most chunk_size rows."""
+    batch = []
+    for row in export_values(transactions, chunk_size):
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_rows(transactions, chunk_size=CHUNK_SIZE):
+    """Yield CSV rows with display labels and blanks for missing names."""
+    for (_, transaction_date, title, amount, type_, category, account, status,
+         description, organization, project, reference) in export_values(transactions, chunk_size):
+        yield (
+            transaction_date,
+            title,
+            amount,
+            TYPE_LABELS.get(type_, type_),
+            category or '',
+            account,
+            STATUS_LABELS.get(status, status),
+            description,
+            organization or '',
+            project or '',
+            reference or '',
+        )
+
+
+def csv_stream(transactions):
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, _, _ in EXPORT_COLUMNS])
+    for row in export_rows(transactions):
+        yield writer.writerow(row)
+
+
+def ndjson_stream(transactions):
+    encoder = DjangoJSONEncoder()
+    for row in export_values(transactions):
+        yield encoder.encode(dict(zip(FIELD_NAMES, row))) + '\n'
+
+
+def _arrow_schema(pa):
+    return pa.schema([
+        ('id', pa.int64()),
+        ('transaction_date', pa.date32()),
+        ('title', pa.string()),
+        ('amount', pa.decimal128(12, 2)),
+        ('type', pa.string()),
+        ('category', pa.string()),
+        ('account', pa.string()),
+        ('status', pa.string()),
+        ('description', pa.string()),
+        ('organization', pa.string()),
+        ('project', pa.string()),
+        ('reference_number', pa.string()),
+    ])
+
+
+def _record_batch(pa, schema, rows):
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema
+    )
+
+
+def parquet_stream(transactions):
+    """Write one Parquet row group per chunk and send each as soon as it is encoded."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(pa)
+    sink = ChunkBuffer()
+    writer = pq.ParquetWriter(sink, schema)
+    for rows in export_batches(transactions):
+        writer.write_batch(_record_batch(pa, schema, rows))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def arrow_stream(transactions):
+    """Write an Arrow IPC stream with one record batch per chunk."""
+    import pyarrow as pa
+
+    schema = _arrow_schema(pa)
+    sink = ChunkBuffer()
+    writer = pa.ipc.new_stream(sink, schema)
+    for rows in export_batches(transactions):
+        writer.write_batch(_record_batch(pa, schema, rows))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+# format -> (stream function, content type, file extension)
+STREAM_FORMATS = {
+    'csv': (csv_stream, 'text/csv', 'csv'),
+    'ndjson': (ndjson_stream, 'application/x-ndjson', 'ndjson'),
+    'parquet': (parquet_stream, 'application/vnd.apache.parquet', 'parquet'),
+    'arrow': (arrow_stream, 'application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+
+def columnar_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
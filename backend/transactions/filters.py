@@ -0,0 +1,20 @@
+import django_filters
+
+from .models import Transaction, TransactionTag
+from .tags import parse_tags
+
+
+class TransactionFilter(django_filters.FilterSet):
+    # ?tags=food,travel matches transactions carrying any of the tags
+    tags = django_filters.CharFilter(method='filter_tags')
+
+    class Meta:
+        model = Transaction
+        fields = ['account', 'type', 'category', 'status', 'organization', 'project', 'is_recurring']
+
+    def filter_tags(self, queryset, name, value):
+        names = parse_tags(value)
+        if not names:
+            return queryset
+        tagged = TransactionTag.objects.filter(tag__name__in=names).values('transaction_id')
+        return queryset.filter(id__in=tagged)
@@ -0,0 +1,245 @@
+import csv
+import io
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction as db_transaction
+
+from organizations.visibility import visible_to
+from .bulk import BATCH_SIZE, BulkTransactionWriter
+from .models import Category, Transaction
+
+# Only the first errors are returned, the total is always reported
+MAX_REPORTED_ERRORS = 500
+
+TYPES = {value: value for value, _ in Transaction.TRANSACTION_TYPES}
+TYPES.update({label.lower(): value for value, label in Transaction.TRANSACTION_TYPES})
+STATUSES = {value: value for value, _ in Transaction.STATUS_CHOICES}
+STATUSES.update({label.lower(): value for value, label in Transaction.STATUS_CHOICES})
+
+# CSV header (lower case) -> import field. Accepts the export's own headers.
+CSV_HEADERS = {
+    'date': 'transaction_date',
+    'transaction_date': 'transaction_date',
+    'title': 'title',
+    'amount': 'amount',
+    'type': 'type',
+    'category': 'category',
+    'status': 'status',
+    'description': 'description',
+    'reference': 'reference_number',
+    'reference_number': 'reference_number',
+    'tags': 'tags',
+}
+
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)')
+
+
+class ImportFileError(Exception):
+    """Raised when an upload cannot be imported at all."""
+
+
+def _text(upload):
+    return io.TextIOWrapper(upload.file, encoding='utf-8-sig', errors='replace', newline='')
+
+
+def parse_csv(upload):
+    """Yield (row number, raw fields) from a CSV upload, one line at a time."""
+    reader = csv.DictReader(_text(upload))
+    if not reader.fieldnames:
+        raise ImportFileError('The CSV file is empty.')
+
+    columns = {name: CSV_HEADERS.get(name.strip().lower()) for name in reader.fieldnames}
+    if not {'transaction_date', 'amount'} <= set(columns.values()):
+        raise ImportFileError('The CSV file needs at least a date and an amount column.')
+
+    for row in reader:
+        fields = {}
+        for name, value in row.items():
+            if columns.get(name):
+                fields[columns[name]] = (value or '').strip()
+        yield reader.line_num, fields
+
+
+def parse_ofx(upload):
+    """
+    Yield (statement entry number, raw fields) for every STMTTRN in an OFX
+    upload. Works for both SGML (unclosed tags) and XML flavours.
+    """
+    entry = None
+    number = 0
+    for line in _text(upload):
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing and entry is not None:
+                    yield number, entry
+                    entry = None
+                elif not closing:
+                    # SGML files may leave the previous entry unclosed
+                    if entry is not None:
+                        yield number, entry
+                    number += 1
+                    entry = {}
+            elif entry is not None and not closing:
+                entry[tag] = value.strip()
+
+    if entry is not None:
+        yield number, entry
+
+
+def _ofx_fields(entry):
+    posted = entry.get('DTPOSTED', '')
+    date = f'{posted[0:4]}-{posted[4:6]}-{posted[6:8]}' if len(posted) >= 8 else posted
+    return {
+        'transaction_date': date,
+        'amount': entry.get('TRNAMT', ''),
+        'title': entry.get('NAME') or entry.get('MEMO') or entry.get('TRNTYPE', ''),
+        'description': entry.get('MEMO', ''),
+        'reference_number': entry.get('FITID', ''),
+    }
+
+
+class TransactionImporter:
+    """
+    Validates parsed rows in batches and bulk inserts them through a
+    BulkTransactionWriter, skipping references already imported.
+    """
+
+    def __init__(self, user, account, organization=None):
+        self.user = user
+        self.account = account
+        self.organization = organization
+        self.imported = 0
+        self.skipped = 0
+        self.error_count = 0
+        self.errors = []
+        self.references = set()
+        self.writer = BulkTransactionWriter()
+
+        self.categories = {
+            name.lower(): category_id
+            for category_id, name in visible_to(Category.objects.all(), user).values_list('id', 'name')
+        }
+        self.date_field = Transaction._meta.get_field('transaction_date')
+
+    def error(self, row, messages):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'errors': messages})
+
+    def build(self, row, fields):
+        errors = []
+
+        try:
+            transaction_date = self.date_field.to_python(fields.get('transaction_date'))
+            if transaction_date is None:
+                errors.append('Date is required.')
+        except ValidationError:
+            errors.append(f"Invalid date '{fields.get('transaction_date')}', use YYYY-MM-DD.")
+            transaction_date = None
+
+        try:
+            amount = Decimal(fields.get('amount', '').replace(',', ''))
+            if not amount.is_finite() or abs(amount) >= Decimal('1e10'):
+                raise InvalidOperation
+        except InvalidOperation:
+            errors.append(f"Invalid amount '{fields.get('amount')}'.")
+            amount = None
+
+        raw_type = fields.get('type', '').lower()
+        if raw_type:
+            type_ = TYPES.get(raw_type)
+            if not type_:
+                errors.append(f"Invalid type '{fields['type']}'.")
+        else:
+            # Without a type column the sign decides
+            type_ = 'outgoing' if amount is not None and amount < 0 else 'incoming'
+
+        raw_status = fields.get('status', '').lower()
+        status = STATUSES.get(raw_status, 'completed') if raw_status else 'completed'
+        if raw_status and raw_status not in STATUSES:
+            errors.append(f"Invalid status '{fields['status']}'.")
+
+        title = fields.get('title') or 'Imported transaction'
+        if len(title) > 100:
+            errors.append('Title is longer than 100 characters.')
+
+        reference = fields.get('reference_number') or None
+        if reference and len(reference) > 100:
+            errors.append('Reference is longer than 100 characters.')
+
+        tags = fields.get('tags') or None
+        if tags and len(tags) > 255:
+            errors.append('Tags are longer than 255 characters.')
+
+        if errors:
+            self.error(row, errors)
+            return None
+
+        return Transaction(
+            user=self.user,
+            account=self.account,
+            organization=self.organization,
+            category_id=self.categories.get(fields.get('category', '').lower()),
+            title=title,
+            amount=abs(amount).quantize(Decimal('0.01')),
+            type=type_,
+            status=status,
+            transaction_date=transaction_date,
+            description=fields.get('description') or None,
+            reference_number=reference,
+            tags=tags,
+        )
+
+    def flush(self, batch):
+        # Rows whose reference was already imported to this account, or seen earlier in the file, are skipped
+        references = [item.reference_number for item in batch if item.reference_number]
+        if references:
+            self.references.update(Transaction.objects.filter(
+                account=self.account,
+                reference_number__in=references
+            ).values_list('reference_number', flat=True))
+
+        fresh = []
+        for item in batch:
+            if item.reference_number:
+                if item.reference_number in self.references:
+                    self.skipped += 1
+                    continue
+                self.references.add(item.reference_number)
+            fresh.append(item)
+
+        self.imported += self.writer.insert(fresh)
+
+    def run(self, rows):
+        with db_transaction.atomic():
+            batch = []
+            for row, fields in rows:
+                item = self.build(row, fields)
+                if item is not None:
+                    batch.append(item)
+                if len(batch) >= BATCH_SIZE:
+                    self.flush(batch)
+                    batch = []
+            if batch:
+                self.flush(batch)
+
+            # One balance update per account and one per rollup row for the whole import
+            self.writer.finish()
+
+        return {
+            'imported': self.imported,
+            'skipped': self.skipped,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+
+def import_transactions(upload, file_format, user, account, organization=None):
+    if file_format == 'ofx':
+        rows = ((row, _ofx_fields(entry)) for row, entry in parse_ofx(upload))
+    else:
+        rows = parse_csv(upload)
+    return TransactionImporter(user, account, organization).run(rows)
@@ -0,0 +1,76 @@
+import logging
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import ReportJob
+from .reports import ReportError
+from . import report_cache
+from .report_cache import get_or_build_report
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_report(report, user):
+    return ReportJob.objects.create(report=report, user=user)
+
+
+def claim_next_job():
+    """
+    Move the oldest queued job to running and return it, or None when the
+    queue is empty. The conditional UPDATE makes the claim safe when several
+    workers poll the same table.
+    """
+    while True:
+        job_id = ReportJob.objects.filter(
+            status='queued'
+        ).order_by('created_at', 'id').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+
+        claimed = ReportJob.objects.filter(id=job_id, status='queued').update(
+            status='running',
+            progress=0,
+            started_at=timezone.now()
+        )
+        if claimed:
+            return ReportJob.objects.select_related('report', 'user').get(id=job_id)
+
+
+def requeue_stale_jobs(stale_after):
+    """Put back jobs whose worker died mid-run."""
+    return ReportJob.objects.filter(
+        status='running',
+        started_at__lt=timezone.now() - timedelta(seconds=stale_after)
+    ).update(status='queued', progress=0, started_at=None)
+
+
+def run_job(job):
+    def progress(percentage):
+        ReportJob.objects.filter(id=job.id).update(progress=percentage)
+
+    try:
+        # The worker runs in its own process, where only a shared cache sees version bumps
+        report_data, _ = get_or_build_report(
+            job.report, job.user, progress=progress, use_cache=report_cache.is_shared()
+        )
+    except Exception as exc:
+        if isinstance(exc, ReportError):
+            logger.warning('Report job %s rejected: %s', job.id, exc)
+        else:
+            logger.exception('Report job %s failed', job.id)
+        ReportJob.objects.filter(id=job.id).update(
+            status='failed',
+            error=str(exc),
+            finished_at=timezone.now()
+        )
+        return False
+
+    # The output lives on the job, the report's parameters stay its inputs
+    ReportJob.objects.filter(id=job.id).update(
+        status='completed',
+        progress=100,
+        result=report_data,
+        finished_at=timezone.now()
+    )
+    return True
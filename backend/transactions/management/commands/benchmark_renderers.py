@@ -0,0 +1,94 @@
+import json
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import Account
+from finance_project.renderers import MessagePackRenderer, ORJSONRenderer, msgpack_available
+from organizations.models import Organization, Project
+from transactions.models import Category, Transaction
+from transactions.serializers import TransactionListSerializer
+
+
+def _payload(size):
+    # Serialized in memory, nothing is read from or written to the database
+    account = Account(id=1, title='Checking', type='checking')
+    categories = [Category(id=index, name=f'Category {index}') for index in range(1, 21)]
+    organization = Organization(id=1, name='Acme')
+    project = Project(id=1, name='Launch', organization=organization)
+    start = date(2020, 1, 1)
+    now = timezone.now()
+
+    transactions = [
+        Transaction(
+            id=index,
+            title=f'Transaction {index}',
+            amount=Decimal(index % 5000) + Decimal('0.99'),
+            type=('incoming', 'outgoing', 'transfer')[index % 3],
+            category=categories[index % len(categories)],
+            account=account,
+            timestamp=now,
+            transaction_date=start + timedelta(days=index % 1500),
+            organization=organization if index % 2 else None,
+            project=project if index % 4 == 1 else None,
+            reference_number=f'REF-{index}',
+            tags='groceries,home' if index % 5 == 0 else None,
+        )
+        for index in range(1, size + 1)
+    ]
+    return {'next': None, 'previous': None, 'results': TransactionListSerializer(transactions, many=True).data}
+
+
+def _time(renderer, data, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        content = renderer.render(data, renderer.media_type, {})
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, content
+
+
+class Command(BaseCommand):
+    help = 'Compare the stock JSON renderer with the orjson and MessagePack renderers on a transaction list payload'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=10000, help='Transactions in the payload')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per renderer, the best is reported')
+
+    def handle(self, *args, **options):
+        data = _payload(options['size'])
+        # Raw Decimals as report endpoints return them, which the stock renderer turns into floats
+        report = {'totals': [{'day': row['transaction_date'], 'total': Decimal(row['amount'])} for row in data['results']]}
+
+        renderers = [JSONRenderer(), ORJSONRenderer()]
+        if msgpack_available():
+            renderers.append(MessagePackRenderer())
+        else:
+            self.stdout.write('msgpack is not installed, skipping MessagePackRenderer')
+
+        self.stdout.write(f"{options['size']} transactions, best of {options['repeat']} runs")
+        baseline = None
+        for renderer in renderers:
+            elapsed, content = _time(renderer, data, options['repeat'])
+            baseline = baseline or elapsed
+            self.stdout.write(
+                f'{type(renderer).__name__:<22} {elapsed * 1000:8.1f} ms  {len(content) / 1024:8.0f} KiB'
+                f'  {baseline / elapsed:5.1f}x'
+            )
+
+        # The page renders to the same JSON value, and raw Decimals stay exact
+        stock = json.loads(JSONRenderer().render(data))
+        fast = json.loads(ORJSONRenderer().render(data))
+        if stock != fast:
+            raise CommandError('ORJSONRenderer output differs from JSONRenderer')
+        rendered = json.loads(ORJSONRenderer().render(report))
+        if any(
+            Decimal(row['total']) != expected['total'] for row, expected in zip(rendered['totals'], report['totals'])
+        ):
+            raise CommandError('ORJSONRenderer lost Decimal precision')
+        self.stdout.write(self.style.SUCCESS('Rendered values match the stock renderer, Decimals are exact'))
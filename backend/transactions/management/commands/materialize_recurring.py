@@ -0,0 +1,47 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from transactions import recurrence
+
+
+class Command(BaseCommand):
+    help = 'Create the due occurrences of recurring transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Materialize occurrences due on or before this date (YYYY-MM-DD), default today')
+        parser.add_argument('--batch-size', type=int, default=recurrence.BATCH_SIZE,
+                            help='Templates processed per database transaction')
+        parser.add_argument('--max-per-template', type=int, default=recurrence.MAX_PER_TEMPLATE,
+                            help='Occurrences created per template and run')
+        parser.add_argument('--interval', type=float,
+                            help='Keep running, materializing again every this many seconds')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid date '{options['date']}', use YYYY-MM-DD.")
+
+        try:
+            while True:
+                close_old_connections()
+                templates, created, skipped = recurrence.materialize_due(
+                    today=today,
+                    batch_size=options['batch_size'],
+                    max_per_template=options['max_per_template']
+                )
+                self.stdout.write(self.style.SUCCESS(
+                    f'Created {created} occurrences from {templates} recurring transactions'
+                ))
+                if skipped:
+                    self.stdout.write(self.style.WARNING(f'Skipped {skipped} occurrences that already existed'))
+                if not options['interval']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from transactions import jobs, report_cache
+
+
+class Command(BaseCommand):
+    help = 'Process queued financial report jobs from the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait between polls of an empty queue')
+        parser.add_argument('--stale-after', type=int, default=3600,
+                            help='Requeue running jobs started more than this many seconds ago')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Report worker started')
+        if not report_cache.is_shared():
+            self.stdout.write(self.style.WARNING(
+                'The cache is local to this process, reports are built without it'
+            ))
+        try:
+            while True:
+                close_old_connections()
+                jobs.requeue_stale_jobs(options['stale_after'])
+
+                job = jobs.claim_next_job()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                if jobs.run_job(job):
+                    self.stdout.write(self.style.SUCCESS(f'Completed report job {job.id}'))
+                else:
+                    self.stdout.write(self.style.ERROR(f'Report job {job.id} failed'))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write('Report worker stopped')
@@ -0,0 +1,144 @@
+# Generated by Django 4.2.5 on 2026-10-18 01:15
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_rollups(apps, schema_editor):
+    Transaction = apps.get_model("transactions", "Transaction")
+    DailyRollup = apps.get_model("transactions", "DailyRollup")
+
+    grouped = (
+        Transaction.objects.filter(
+            status="completed", type__in=("incoming", "outgoing")
+        )
+        .values(
+            "user_id",
+            "account_id",
+            "category_id",
+            "organization_id",
+            "project_id",
+            "transaction_date",
+        )
+        .annotate(
+            total_income=models.Sum("amount", filter=models.Q(type="incoming")),
+            total_expenses=models.Sum("amount", filter=models.Q(type="outgoing")),
+            total_count=models.Count("id"),
+        )
+        .order_by()
+    )
+    DailyRollup.objects.bulk_create(
+        [
+            DailyRollup(
+                user_id=row["user_id"],
+                account_id=row["account_id"],
+                category_id=row["category_id"],
+                organization_id=row["organization_id"],
+                project_id=row["project_id"],
+                date=row["transaction_date"],
+                income=row["total_income"] or Decimal("0.00"),
+                expenses=row["total_expenses"] or Decimal("0.00"),
+                transaction_count=row["total_count"],
+            )
+            for row in grouped.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("organizations", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("accounts", "0001_initial"),
+        ("transactions", "0002_category_is_business_expense_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "income",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=14
+                    ),
+                ),
+                (
+                    "expenses",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=14
+                    ),
+                ),
+                ("transaction_count", models.IntegerField(default=0)),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_rollups",
+                        to="accounts.account",
+                    ),
+                ),
+                (
+                    "category",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="daily_rollups",
+                        to="transactions.category",
+                    ),
+                ),
+                (
+                    "organization",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_rollups",
+                        to="organizations.organization",
+                    ),
+                ),
+                (
+                    "project",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="daily_rollups",
+                        to="organizations.project",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_rollups",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["user", "date"], name="rollup_user_date_idx"),
+                    models.Index(
+                        fields=["organization", "date"], name="rollup_org_date_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
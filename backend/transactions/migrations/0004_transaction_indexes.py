@@ -0,0 +1,65 @@
+# Generated by Django 4.2.5 on 2026-10-18 01:17
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0003_dailyrollup"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="financialreport",
+            name="parameters",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                encoder=django.core.serializers.json.DjangoJSONEncoder,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "transaction_date"], name="txn_user_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["organization", "transaction_date"], name="txn_org_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "status", "type", "transaction_date"],
+                name="txn_user_status_type_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["organization", "status", "type", "transaction_date"],
+                name="txn_org_status_type_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(("status", "completed"), ("type", "outgoing")),
+                fields=["user", "transaction_date"],
+                name="txn_user_spent_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(("status", "completed"), ("type", "outgoing")),
+                fields=["project", "transaction_date"],
+                name="txn_project_spent_date_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.5 on 2026-10-18 01:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0005_reportjob"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="transaction",
+            name="txn_user_date_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="transaction",
+            name="txn_org_date_idx",
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "transaction_date", "id"], name="txn_user_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["organization", "transaction_date", "id"],
+                name="txn_org_date_idx",
+            ),
+        ),
+    ]
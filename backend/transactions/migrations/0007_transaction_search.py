@@ -0,0 +1,101 @@
+# Generated by Django 4.2.5 on 2026-10-18 01:50
+
+from django.db import migrations
+
+FTS_TABLE = "transactions_transaction_fts"
+
+SQLITE_FORWARD = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, description, tags,
+        content='transactions_transaction',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON transactions_transaction BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, tags)
+        VALUES (new.id, new.title, new.description, new.tags);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON transactions_transaction BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, tags)
+        VALUES ('delete', old.id, old.title, old.description, old.tags);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF title, description, tags ON transactions_transaction BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, tags)
+        VALUES ('delete', old.id, old.title, old.description, old.tags);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, tags)
+        VALUES (new.id, new.title, new.description, new.tags);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+# Must match transactions.search._document for the planner to use the index
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX txn_search_vector_idx ON transactions_transaction USING GIN (
+        to_tsvector('simple'::regconfig,
+            coalesce(title, '') || ' ' || coalesce(description, '') || ' ' || coalesce(tags, ''))
+    )
+    """,
+]
+
+POSTGRES_BACKWARD = ["DROP INDEX IF EXISTS txn_search_vector_idx"]
+
+
+def _fts5_available(cursor):
+    cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+    if cursor.fetchone()[0]:
+        return True
+    # Loadable builds report nothing at compile time, so probe for the module
+    cursor.execute("SELECT 1 FROM pragma_module_list WHERE name = 'fts5'")
+    return cursor.fetchone() is not None
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            if not _fts5_available(cursor):
+                return
+        statements = SQLITE_FORWARD
+    elif connection.vendor == "postgresql":
+        statements = POSTGRES_FORWARD
+    else:
+        return
+
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRES_BACKWARD}.get(
+        vendor, []
+    )
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0006_transaction_cursor_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,111 @@
+# Generated by Django 4.2.5 on 2026-10-18 01:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_tags(apps, schema_editor):
+    Transaction = apps.get_model("transactions", "Transaction")
+    Tag = apps.get_model("transactions", "Tag")
+    TransactionTag = apps.get_model("transactions", "TransactionTag")
+
+    tag_ids = {}
+    batch = []
+    rows = (
+        Transaction.objects.exclude(tags__isnull=True)
+        .exclude(tags="")
+        .values_list("id", "tags")
+    )
+    for transaction_id, tags in rows.iterator(chunk_size=1000):
+        names = []
+        for part in tags.split(","):
+            name = part.strip().lower()[:50]
+            if name and name not in names:
+                names.append(name)
+        for name in names:
+            if name not in tag_ids:
+                tag_ids[name] = Tag.objects.get_or_create(name=name)[0].id
+            batch.append(
+                TransactionTag(transaction_id=transaction_id, tag_id=tag_ids[name])
+            )
+        if len(batch) >= 1000:
+            TransactionTag.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        TransactionTag.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0007_transaction_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tag",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="TransactionTag",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "tag",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="transaction_links",
+                        to="transactions.tag",
+                    ),
+                ),
+                (
+                    "transaction",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tag_links",
+                        to="transactions.transaction",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="tag_set",
+            field=models.ManyToManyField(
+                blank=True,
+                related_name="transactions",
+                through="transactions.TransactionTag",
+                to="transactions.tag",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transactiontag",
+            index=models.Index(
+                fields=["tag", "transaction"], name="txn_tag_tag_txn_idx"
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="transactiontag",
+            unique_together={("transaction", "tag")},
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.5 on 2026-10-18 01:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0008_transaction_tags"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="recurrence_next_date",
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="recurrence_template",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="occurrences",
+                to="transactions.transaction",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(("is_recurring", True)),
+                fields=["recurrence_next_date", "id"],
+                name="txn_recurring_due_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="transaction",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("recurrence_template__isnull", False)),
+                fields=("recurrence_template", "transaction_date"),
+                name="txn_unique_occurrence",
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.5 on 2026-10-18 01:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0009_recurring_transactions"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["account", "transaction_date"], name="txn_account_date_idx"
+            ),
+        ),
+    ]
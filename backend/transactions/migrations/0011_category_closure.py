@@ -0,0 +1,76 @@
+# Generated by Django 4.2.5 on 2026-10-18 01:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_closure(apps, schema_editor):
+    Category = apps.get_model("transactions", "Category")
+    CategoryClosure = apps.get_model("transactions", "CategoryClosure")
+
+    parents = dict(Category.objects.values_list("id", "parent_id"))
+    batch = []
+    for category_id in parents:
+        # Walk up to the root, stopping at a cycle should the data have one
+        ancestor_id, depth, seen = category_id, 0, set()
+        while ancestor_id is not None and ancestor_id not in seen:
+            seen.add(ancestor_id)
+            batch.append(
+                CategoryClosure(
+                    ancestor_id=ancestor_id, descendant_id=category_id, depth=depth
+                )
+            )
+            ancestor_id, depth = parents.get(ancestor_id), depth + 1
+        if len(batch) >= 1000:
+            CategoryClosure.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        CategoryClosure.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0010_transaction_account_date_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CategoryClosure",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("depth", models.PositiveIntegerField()),
+                (
+                    "ancestor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="descendant_links",
+                        to="transactions.category",
+                    ),
+                ),
+                (
+                    "descendant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ancestor_links",
+                        to="transactions.category",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="categoryclosure",
+            constraint=models.UniqueConstraint(
+                fields=("ancestor", "descendant"), name="category_closure_uniq"
+            ),
+        ),
+        migrations.RunPython(backfill_closure, migrations.RunPython.noop),
+    ]
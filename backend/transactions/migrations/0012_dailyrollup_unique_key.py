@@ -0,0 +1,66 @@
+# Generated by Django 4.2.5 on 2026-10-18 02:07
+
+from django.db import migrations, models
+import django.db.models.functions.comparison
+
+
+def merge_duplicate_rollups(apps, schema_editor):
+    # Rows a deleted category or project left behind under the same key
+    DailyRollup = apps.get_model("transactions", "DailyRollup")
+
+    key = (
+        "user_id",
+        "account_id",
+        "category_id",
+        "organization_id",
+        "project_id",
+        "date",
+    )
+    duplicates = (
+        DailyRollup.objects.values(*key)
+        .annotate(
+            rows=models.Count("id"),
+            total_income=models.Sum("income"),
+            total_expenses=models.Sum("expenses"),
+            total_count=models.Sum("transaction_count"),
+        )
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for group in list(duplicates):
+        rows = DailyRollup.objects.filter(**{name: group[name] for name in key})
+        keep = rows.order_by("id").first()
+        rows.exclude(pk=keep.pk).delete()
+        keep.income = group["total_income"]
+        keep.expenses = group["total_expenses"]
+        keep.transaction_count = group["total_count"]
+        keep.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0011_category_closure"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_rollups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="dailyrollup",
+            constraint=models.UniqueConstraint(
+                models.F("user"),
+                models.F("account"),
+                django.db.models.functions.comparison.Coalesce(
+                    "category", models.Value(0)
+                ),
+                django.db.models.functions.comparison.Coalesce(
+                    "organization", models.Value(0)
+                ),
+                django.db.models.functions.comparison.Coalesce(
+                    "project", models.Value(0)
+                ),
+                models.F("date"),
+                name="rollup_unique_key",
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.5 on 2026-10-18 02:26
+
+from django.db import migrations, models
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0012_dailyrollup_unique_key"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="dailyrollup",
+            name="rollup_unique_key",
+        ),
+        migrations.AddConstraint(
+            model_name="dailyrollup",
+            constraint=models.UniqueConstraint(
+                models.F("user"),
+                models.F("account"),
+                django.db.models.functions.comparison.Coalesce(
+                    "category", models.Value(0, output_field=models.IntegerField())
+                ),
+                django.db.models.functions.comparison.Coalesce(
+                    "organization", models.Value(0, output_field=models.IntegerField())
+                ),
+                django.db.models.functions.comparison.Coalesce(
+                    "project", models.Value(0, output_field=models.IntegerField())
+                ),
+                models.F("date"),
+                name="rollup_unique_key",
+            ),
+        ),
+    ]
@@ -1,9 +1,16 @@
-from django.db import models
+from django.db import models, transaction as db_transaction
+from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 from accounts.models import Account
+from accounts.balances import apply_deltas, merge_deltas, shift_checkpoints
 from decimal import Decimal
 from organizations.models import Organization, Project
 from django.utils import timezone
+from datetime import timedelta
+from . import rollups, report_cache
+from .tags import sync_tags
+from . import categories
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
@@ -19,9 +26,116 @@ class Category(models.Model):
     class Meta:
         verbose_name_plural = 'Categories'
     
+    def save(self, *args, **kwargs):
+        with db_transaction.atomic():
+            creating = self._state.adding
+            parent_changed = False
+            if not creating:
+                stored_parent_id = Category.objects.filter(pk=self.pk).values_list('parent_id', flat=True).first()
+                parent_changed = stored_parent_id != self.parent_id
+                if parent_changed and self.parent_id and categories.is_descendant(self.parent_id, self.pk):
+                    raise ValidationError('A category cannot be nested under itself or one of its subcategories.')
+            
+            super().save(*args, **kwargs)
+            
+            # Keep the closure table in step with the tree
+            if creating:
+                categories.link_new(self)
+            elif parent_changed:
+                categories.move(self)
+        # Category names and flags appear in reports of every period
+        db_transaction.on_commit(lambda: report_cache.bump_epoch(self.user_id, self.organization_id))
+    
+    def delete(self, *args, **kwargs):
+        user_id, organization_id = self.user_id, self.organization_id
+        with db_transaction.atomic():
+            categories.detach_children(self)
+            result = super().delete(*args, **kwargs)
+        db_transaction.on_commit(lambda: report_cache.bump_epoch(user_id, organization_id))
+        return result
+    
     def __str__(self):
         return self.name
 
+class CategoryClosure(models.Model):
+    """
+    Every (ancestor, descendant) pair of the category tree, each category
+    being its own ancestor at depth 0. Maintained by Category.save/delete,
+    it lets spend roll up to any ancestor with one join.
+    """
+    ancestor = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveIntegerField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='category_closure_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.ancestor_id} > {self.descendant_id} ({self.depth})"
+
+def balance_effect(state):
+    """
+    How a transaction in the given state moves account balances, as
+    {account_id: delta}. Only completed transactions move money.
+    """
+    if not state or state['status'] != 'completed':
+        return {}
+    
+    amount = state['amount']
+    if state['type'] == 'incoming':
+        return {state['account_id']: amount}
+    elif state['type'] == 'outgoing':
+        return {state['account_id']: -amount}
+    elif state['type'] == 'transfer' and state['destination_account_id']:
+        # Handle transfers between accounts
+        return merge_deltas(
+            {state['account_id']: -amount},
+            {state['destination_account_id']: amount}
+        )
+    return {}
+
+def dated_balance_effect(state, sign=1):
+    """balance_effect keyed by (account_id, transaction date), for shifting balance checkpoints."""
+    return {
+        (account_id, state['transaction_date']): sign * delta
+        for account_id, delta in balance_effect(state).items()
+    }
+
+class TransactionQuerySet(models.QuerySet):
+    """
+    Keeps queryset writes from bypassing the balance, checkpoint and rollup
+    bookkeeping of Transaction.save/delete: delete() applies it in bulk and
+    update() refuses the fields it depends on.
+    """
+    # Fields whose change moves balances or rollups, or needs the tag table synced
+    GUARDED_FIELDS = {name.removesuffix('_id') for name in rollups.ROLLUP_FIELDS} | {'tags'}
+    
+    def delete(self):
+        from .bulk import BulkTransactionWriter
+        
+        with db_transaction.atomic(using=self.db):
+            writer = BulkTransactionWriter()
+            writer.remove(list(self.select_for_update().values(*rollups.ROLLUP_FIELDS)))
+            result = super().delete()
+            writer.finish()
+        return result
+    
+    delete.alters_data = True
+    delete.queryset_only = True
+    
+    def update(self, **kwargs):
+        guarded = self.GUARDED_FIELDS.intersection(name.removesuffix('_id') for name in kwargs)
+        if guarded:
+            raise ValueError(
+                f"Cannot update {', '.join(sorted(guarded))} through a queryset, "
+                "save each transaction so balances and rollups follow."
+            )
+        return super().update(**kwargs)
+    
+    update.alters_data = True
+
 class Transaction(models.Model):
     TRANSACTION_TYPES = (
         ('incoming', 'Incoming'),
@@ -61,34 +175,151 @@ class Transaction(models.Model):
     is_recurring = models.BooleanField(default=False)
     recurrence_type = models.CharField(max_length=20, choices=RECURRENCE_CHOICES, default='none')
     recurrence_end_date = models.DateField(null=True, blank=True)
+    # High-water mark of a recurring template: the date of the next occurrence to materialize
+    recurrence_next_date = models.DateField(null=True, blank=True, editable=False)
+    # Set on occurrences generated from a recurring template
+    recurrence_template = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='occurrences'
+    )
     reference_number = models.CharField(max_length=100, blank=True, null=True)
     tags = models.CharField(max_length=255, blank=True, null=True)
+    # Normalized copy of tags, kept in sync on save for indexed filtering and grouping
+    tag_set = models.ManyToManyField('Tag', through='TransactionTag', related_name='transactions', blank=True)
     
     # For transfers between accounts
     destination_account = models.ForeignKey(Account, on_delete=models.SET_NULL, null=True, blank=True, related_name='incoming_transfers')
     
+    objects = TransactionQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            # Date range scans per owner (export, recent transactions, reports), id
+            # keeps the (transaction_date, id) cursor pages on the index
+            models.Index(fields=['user', 'transaction_date', 'id'], name='txn_user_date_idx'),
+            models.Index(fields=['organization', 'transaction_date', 'id'], name='txn_org_date_idx'),
+            # Balance changes of an account since a checkpoint (as-of balances)
+            models.Index(fields=['account', 'transaction_date'], name='txn_account_date_idx'),
+            # Status/type filtered date ranges (summaries, dashboard, reports)
+            models.Index(fields=['user', 'status', 'type', 'transaction_date'], name='txn_user_status_type_date_idx'),
+            models.Index(fields=['organization', 'status', 'type', 'transaction_date'], name='txn_org_status_type_date_idx'),
+            # Completed expenses only, used by budget and project spend
+            models.Index(
+                fields=['user', 'transaction_date'],
+                condition=models.Q(status='completed', type='outgoing'),
+                name='txn_user_spent_date_idx'
+            ),
+            models.Index(
+                fields=['project', 'transaction_date'],
+                condition=models.Q(status='completed', type='outgoing'),
+                name='txn_project_spent_date_idx'
+            ),
+            # Recurring templates by next due date, for the materialization run
+            models.Index(
+                fields=['recurrence_next_date', 'id'],
+                condition=models.Q(is_recurring=True),
+                name='txn_recurring_due_idx'
+            ),
+        ]
+        constraints = [
+            # A template never yields two occurrences on the same date, so re-runs are safe
+            models.UniqueConstraint(
+                fields=['recurrence_template', 'transaction_date'],
+                condition=models.Q(recurrence_template__isnull=False),
+                name='txn_unique_occurrence'
+            ),
+        ]
+    
+    def _stored_state(self):
+        # Lock the stored row so concurrent edits of this transaction apply their deltas in turn
+        if not self.pk:
+            return None
+        return Transaction.objects.select_for_update().filter(pk=self.pk).values(*rollups.ROLLUP_FIELDS, 'tags').first()
+    
     def save(self, *args, **kwargs):
-        is_new = not self.pk
-        super().save(*args, **kwargs)
-        
-        # Update account balance when transaction is created or status changes to completed
-        if is_new or (not is_new and self.status == 'completed'):
-            if self.type == 'incoming':
-                self.account.balance += self.amount
-                self.account.save()
-            elif self.type == 'outgoing':
-                self.account.balance -= self.amount
-                self.account.save()
-            elif self.type == 'transfer' and self.destination_account:
-                # Handle transfers between accounts
-                self.account.balance -= self.amount
-                self.account.save()
-                self.destination_account.balance += self.amount
-                self.destination_account.save()
+        with db_transaction.atomic():
+            previous = self._stored_state()
+            # Lets post_save receivers see where the transaction was before
+            self._previous_state = previous
+            super().save(*args, **kwargs)
+            
+            # Move account balances by the difference between the old and new effect
+            current = rollups.snapshot(self)
+            apply_deltas(merge_deltas(
+                balance_effect(current),
+                {account_id: -delta for account_id, delta in balance_effect(previous).items()}
+            ))
+            shift_checkpoints(merge_deltas(dated_balance_effect(current), dated_balance_effect(previous, -1)))
+            
+            # Keep the daily rollup in step with this transaction
+            rollups.apply_change(previous, current)
+            
+            if (previous['tags'] if previous else None) != self.tags:
+                sync_tags(self)
+            
+            # Invalidate cached reports covering the old and new dates
+            db_transaction.on_commit(lambda: report_cache.bump_transaction(previous, current))
+    
+    def delete(self, *args, **kwargs):
+        with db_transaction.atomic():
+            previous = self._stored_state()
+            apply_deltas({account_id: -delta for account_id, delta in balance_effect(previous).items()})
+            shift_checkpoints(dated_balance_effect(previous, -1))
+            rollups.apply_change(previous, None)
+            db_transaction.on_commit(lambda: report_cache.bump_transaction(previous))
+            return super().delete(*args, **kwargs)
     
     def __str__(self):
         return f"{self.title} - {self.amount} ({self.get_type_display()})"
 
+class Tag(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    
+    def __str__(self):
+        return self.name
+
+class TransactionTag(models.Model):
+    transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, related_name='tag_links')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='transaction_links')
+    
+    class Meta:
+        unique_together = ('transaction', 'tag')
+        indexes = [
+            # tags= filter and spend by tag go from the tag to its transactions
+            models.Index(fields=['tag', 'transaction'], name='txn_tag_tag_txn_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.transaction_id} - {self.tag_id}"
+
+class DailyRollup(models.Model):
+    """
+    Completed income and expenses per user, account, category, organization,
+    project and day. Maintained by Transaction.save/delete and rebuilt with
+    the rebuild_rollups management command.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_rollups')
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='daily_rollups')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='daily_rollups')
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, null=True, blank=True, related_name='daily_rollups')
+    project = models.ForeignKey(Project, on_delete=models.SET_NULL, null=True, blank=True, related_name='daily_rollups')
+    date = models.DateField()
+    income = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    expenses = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    transaction_count = models.IntegerField(default=0)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date'], name='rollup_user_date_idx'),
+            models.Index(fields=['organization', 'date'], name='rollup_org_date_idx'),
+        ]
+        constraints = [
+            # One row per rollup key, NULLs included; rollups.UPSERT_SQL conflicts on it
+            models.UniqueConstraint(*rollups.KEY_EXPRESSIONS, name='rollup_unique_key'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} - {self.date}: +{self.income} / -{self.expenses}"
+
 class Budget(models.Model):
     PERIOD_CHOICES = (
         ('weekly', 'Weekly'),
@@ -109,26 +340,30 @@ class Budget(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
-    @property
-    def spent(self):
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        # Calculate date range based on period
-        today = timezone.now().date()
+    def get_period_start(self, today):
         if self.period == 'weekly':
-            start_of_period = today - timedelta(days=today.weekday())
+            return today - timedelta(days=today.weekday())
         elif self.period == 'monthly':
-            start_of_period = today.replace(day=1)
+            return today.replace(day=1)
         elif self.period == 'quarterly':
             month = ((today.month - 1) // 3) * 3 + 1
-            start_of_period = today.replace(month=month, day=1)
+            return today.replace(month=month, day=1)
         else:  # yearly
-            start_of_period = today.replace(month=1, day=1)
+            return today.replace(month=1, day=1)
+    
+    @property
+    def spent(self):
+        # Set in bulk by transactions.budgets.resolve_spent
+        if hasattr(self, '_spent'):
+            return self._spent
+        
+        # Calculate date range based on period
+        today = timezone.now().date()
+        start_of_period = self.get_period_start(today)
         
         # Filter transactions for the current period
         transactions = Transaction.objects.filter(
-            user=self.user,
+            user_id=self.user_id,
             type='outgoing',
             status='completed',
             transaction_date__gte=start_of_period,
@@ -136,20 +371,20 @@ class Budget(models.Model):
         )
         
         # Add category filter if specified
-        if self.category:
-            transactions = transactions.filter(category=self.category)
+        if self.category_id:
+            transactions = transactions.filter(category_id=self.category_id)
         
         # Add project filter if specified
-        if self.project:
-            transactions = transactions.filter(project=self.project)
+        if self.project_id:
+            transactions = transactions.filter(project_id=self.project_id)
             
         # Add organization filter if specified
-        if self.organization:
-            transactions = transactions.filter(organization=self.organization)
+        if self.organization_id:
+            transactions = transactions.filter(organization_id=self.organization_id)
         
         # Calculate total spent
-        total_spent = transactions.aggregate(models.Sum('amount'))['amount__sum'] or Decimal('0.00')
-        return total_spent
+        self._spent = transactions.aggregate(models.Sum('amount'))['amount__sum'] or Decimal('0.00')
+        return self._spent
     
     @property
     def remaining(self):
@@ -184,7 +419,33 @@ class FinancialReport(models.Model):
     start_date = models.DateField(default=timezone.now)
     end_date = models.DateField(default=timezone.now)
     created_at = models.DateTimeField(auto_now_add=True)
-    parameters = models.JSONField(default=dict, blank=True)
+    parameters = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
     
     def __str__(self):
         return f"{self.title} ({self.get_report_type_display()})"
+
+class ReportJob(models.Model):
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+    
+    report = models.ForeignKey(FinancialReport, on_delete=models.CASCADE, related_name='jobs')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='report_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    progress = models.PositiveSmallIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='report_job_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.report.title} ({self.get_status_display()}, {self.progress}%)"
@@ -0,0 +1,123 @@
+import json
+from base64 import b64decode, b64encode
+from urllib import parse
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class TransactionCursorPagination(CursorPagination):
+    """
+    Cursor pagination on (ordering field, id). The cursor stores the last
+    row's sort value and id, so every page is a bounded index range scan
+    with no COUNT and no OFFSET, however deep the client scrolls.
+
+    Clients may pick any single field from the view's ordering_fields with
+    ?ordering=; id is always added as the tie breaker in the same direction.
+    Full-text search results are ordered by search_rank by default.
+    """
+    ordering = '-transaction_date'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, request, queryset, view):
+        field = self.ordering
+        # Search results default to relevance order
+        if 'search_rank' in queryset.query.annotations:
+            field = '-search_rank'
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter):
+                terms = backend().get_ordering(request, queryset, view)
+                if terms and request.query_params.get(backend.ordering_param):
+                    field = terms[0]
+                break
+
+        return (field, '-id') if field.startswith('-') else (field, 'id')
+
+    def ordering_field(self, queryset, name):
+        # Annotations such as search_rank are encoded through their output field
+        if name in queryset.query.annotations:
+            field = queryset.query.annotations[name].output_field.clone()
+            field.set_attributes_from_name(name)
+            return field
+        return queryset.model._meta.get_field(name)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.field = self.ordering[0].lstrip('-')
+        self.descending = self.ordering[0].startswith('-')
+        self.model_field = self.ordering_field(queryset, self.field)
+
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor['reverse'])
+
+        # Walking backwards flips both the sort and the comparison
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(term[1:] if term.startswith('-') else '-' + term for term in ordering)
+        queryset = queryset.order_by(*ordering)
+
+        if self.cursor:
+            value, pk = self.cursor['value'], self.cursor['id']
+            before = self.descending != reverse
+            lookup = 'lt' if before else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{lookup}': value}) |
+                Q(**{self.field: value, f'id__{lookup}': pk})
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+
+        if reverse:
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, instance, reverse):
+        value = self.model_field.value_to_string(instance)
+        payload = json.dumps({'v': value, 'id': instance.pk, 'r': int(reverse)})
+        encoded = b64encode(payload.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            payload = json.loads(b64decode(parse.unquote(encoded).encode('ascii')).decode('ascii'))
+            return {
+                'value': self.model_field.to_python(payload['v']),
+                'id': int(payload['id']),
+                'reverse': bool(payload.get('r')),
+            }
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
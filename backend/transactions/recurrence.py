@@ -0,0 +1,175 @@
+import calendar
+import logging
+from datetime import date, timedelta
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .bulk import BulkTransactionWriter
+from .models import Transaction
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+# Occurrences generated per template and run. A template far behind catches
+# up over several runs instead of making one run arbitrarily long
+MAX_PER_TEMPLATE = 366
+
+# Copied from a template onto each of its occurrences
+COPIED_FIELDS = (
+    'user_id', 'account_id', 'title', 'amount', 'type', 'category_id', 'status', 'description',
+    'organization_id', 'project_id', 'tags', 'destination_account_id',
+)
+
+
+def _add_months(start, months):
+    month = start.month - 1 + months
+    year = start.year + month // 12
+    month = month % 12 + 1
+    # Clamp to the end of shorter months, e.g. the 31st to Feb 28/29
+    day = min(start.day, calendar.monthrange(year, month)[1])
+    return date(year, month, day)
+
+
+def occurrence_date(start, recurrence_type, n):
+    """Date of the n-th occurrence of a template dated start (n=0 is the template itself)."""
+    if recurrence_type == 'daily':
+        return start + timedelta(days=n)
+    if recurrence_type == 'weekly':
+        return start + timedelta(weeks=n)
+    if recurrence_type == 'monthly':
+        return _add_months(start, n)
+    if recurrence_type == 'yearly':
+        return _add_months(start, 12 * n)
+    raise ValueError(f'Unknown recurrence type {recurrence_type!r}')
+
+
+def occurrence_index(start, recurrence_type, on):
+    """Inverse of occurrence_date for dates that are occurrences of the template."""
+    if recurrence_type == 'daily':
+        return (on - start).days
+    if recurrence_type == 'weekly':
+        return (on - start).days // 7
+    months = (on.year - start.year) * 12 + on.month - start.month
+    if recurrence_type == 'monthly':
+        return months
+    return months // 12
+
+
+def due_templates(today):
+    return Transaction.objects.filter(
+        Q(recurrence_next_date__lte=today) | Q(recurrence_next_date__isnull=True),
+        is_recurring=True,
+    ).exclude(
+        recurrence_type='none'
+    ).exclude(
+        # Past their end date for good
+        recurrence_end_date__lt=F('recurrence_next_date')
+    )
+
+
+def occurrences_for(template, today, limit=MAX_PER_TEMPLATE):
+    """
+    Build (unsaved) the template's occurrences due on or before today and
+    advance its recurrence_next_date past them.
+    """
+    start = template.transaction_date
+    if template.recurrence_next_date:
+        n = occurrence_index(start, template.recurrence_type, template.recurrence_next_date)
+    else:
+        n = 1
+
+    until = today
+    if template.recurrence_end_date and template.recurrence_end_date < until:
+        until = template.recurrence_end_date
+
+    occurrences = []
+    on = occurrence_date(start, template.recurrence_type, n)
+    while on <= until and len(occurrences) < limit:
+        occurrence = Transaction(
+            transaction_date=on,
+            recurrence_template_id=template.id,
+            **{field: getattr(template, field) for field in COPIED_FIELDS}
+        )
+        occurrences.append(occurrence)
+        n += 1
+        on = occurrence_date(start, template.recurrence_type, n)
+
+    template.recurrence_next_date = on
+    return occurrences
+
+
+def _insert_new(writer, templates, occurrences):
+    """
+    Insert the occurrences, leaving out those that already exist. Returns
+    how many were left out. The batch's templates are locked, so nothing
+    can add occurrences of them between the lookup and the insert.
+    """
+    try:
+        with db_transaction.atomic():
+            writer.insert(occurrences)
+        return 0
+    except IntegrityError:
+        # Only the savepoint is rolled back; the unique constraint on
+        # (template, date) names the occurrences that already exist
+        existing = set(Transaction.objects.filter(
+            recurrence_template_id__in=[template.id for template in templates]
+        ).values_list('recurrence_template_id', 'transaction_date'))
+        fresh = [
+            occurrence for occurrence in occurrences
+            if (occurrence.recurrence_template_id, occurrence.transaction_date) not in existing
+        ]
+        for occurrence in fresh:
+            # Earlier chunks of the failed insert were given ids that the rollback discarded
+            occurrence.pk = None
+            occurrence._state.adding = True
+        writer.insert(fresh)
+        return len(occurrences) - len(fresh)
+
+
+def materialize_due(today=None, batch_size=BATCH_SIZE, max_per_template=MAX_PER_TEMPLATE):
+    """
+    Insert every occurrence of a recurring template due on or before today.
+    Templates are walked in id order, one batch per database transaction: the
+    batch's occurrences are bulk inserted, their balance and rollup effects
+    applied once, and the templates' high-water marks moved forward in the
+    same commit, so an interrupted run resumes where it stopped and a re-run
+    creates nothing twice. Occurrences that exist already, e.g. after a
+    high-water mark was reset, are skipped and counted.
+    Returns (templates processed, occurrences created, occurrences skipped).
+    """
+    today = today or timezone.now().date()
+    templates_done = created = skipped = 0
+    last_id = 0
+
+    while True:
+        with db_transaction.atomic():
+            # Rows another worker holds are skipped, it is materializing them
+            templates = list(
+                due_templates(today).filter(id__gt=last_id).order_by('id')
+                .select_for_update(skip_locked=True)[:batch_size]
+            )
+            if not templates:
+                break
+            last_id = templates[-1].id
+
+            occurrences = []
+            for template in templates:
+                occurrences.extend(occurrences_for(template, today, max_per_template))
+
+            writer = BulkTransactionWriter()
+            batch_skipped = _insert_new(writer, templates, occurrences) if occurrences else 0
+            writer.finish()
+            Transaction.objects.bulk_update(templates, ['recurrence_next_date'], batch_size=batch_size)
+
+        if batch_skipped:
+            logger.warning(
+                'Skipped %s existing occurrences of recurring transactions %s to %s',
+                batch_skipped, templates[0].id, last_id
+            )
+        templates_done += len(templates)
+        created += len(occurrences) - batch_skipped
+        skipped += batch_skipped
+
+    return templates_done, created, skipped
@@ -0,0 +1,128 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from organizations.visibility import organization_ids_for
+
+# These depend on data outside the report's date range (current budget period,
+# all-time project spend, balances before the start date), so range versions
+# cannot tell when they are stale
+UNCACHED_REPORT_TYPES = ('budget_analysis', 'project_finance', 'cash_flow')
+
+EPOCH = 'epoch'
+
+
+def _version_key(scope, bucket):
+    return f'report-version:{scope}:{bucket}'
+
+
+def scopes_for(user_id=None, organization_id=None):
+    scopes = []
+    if user_id:
+        scopes.append(f'user:{user_id}')
+    if organization_id:
+        scopes.append(f'org:{organization_id}')
+    return scopes
+
+
+def month_buckets(start_date, end_date):
+    buckets = []
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        buckets.append(f'{year:04d}-{month:02d}')
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return buckets
+
+
+def bump(scopes, buckets):
+    """
+    Advance the version of every (scope, bucket) pair. A missing counter is
+    seeded from the clock rather than zero, so an evicted counter can never
+    line up with a result cached under its earlier value.
+    """
+    for scope in scopes:
+        for bucket in buckets:
+            key = _version_key(scope, bucket)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), None)
+
+
+def bump_transaction(*states):
+    """Invalidate the months touched by the given transaction states, before and after a write."""
+    for state in states:
+        if state:
+            date = state['transaction_date']
+            bump(
+                scopes_for(state['user_id'], state['organization_id']),
+                [f'{date.year:04d}-{date.month:02d}']
+            )
+
+
+def bump_epoch(user_id=None, organization_id=None):
+    """Invalidate every cached report of a scope, e.g. when a category is renamed."""
+    bump(scopes_for(user_id, organization_id), [EPOCH])
+
+
+def is_shared():
+    """
+    Whether other processes see this process's cache. Versions are bumped
+    by the web process, so a process-local cache in the report worker would
+    never see them and could serve stale reports.
+    """
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def _versions(keys):
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def report_cache_key(report, user):
+    organization_ids = sorted(organization_ids_for(user))
+    if report.organization_id:
+        scopes = scopes_for(organization_id=report.organization_id)
+    else:
+        scopes = scopes_for(user_id=user.id) + [f'org:{organization_id}' for organization_id in organization_ids]
+
+    buckets = [EPOCH] + month_buckets(report.start_date, report.end_date)
+    keys = [_version_key(scope, bucket) for scope in scopes for bucket in buckets]
+
+    # What the user may see depends on who they are and which organizations
+    # they belong to, so joining or leaving one gives a new key
+    stamp = ':'.join(str(version) for version in _versions(keys))
+    raw = (
+        f'{report.report_type}:{report.start_date}:{report.end_date}:{report.organization_id}:'
+        f'{user.id}:{organization_ids}:{stamp}'
+    )
+    return 'report-result:' + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def get_or_build_report(report, user, progress=None, use_cache=True):
+    """
+    Return (report_data, cached). Results are cached under the versions of
+    every month in the report's range, so only writes inside the range
+    invalidate them. use_cache=False always builds the report afresh.
+    """
+    from .reports import build_report
+
+    if not use_cache or report.report_type in UNCACHED_REPORT_TYPES:
+        return build_report(report, user, progress=progress), False
+
+    key = report_cache_key(report, user)
+    report_data = cache.get(key)
+    if report_data is not None:
+        return report_data, True
+
+    report_data = build_report(report, user, progress=progress)
+    cache.set(key, report_data, getattr(settings, 'REPORT_CACHE_TIMEOUT', 60 * 60 * 24))
+    return report_data, False
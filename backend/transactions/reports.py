@@ -0,0 +1,231 @@
+from django.db.models import Sum
+from django.shortcuts import get_object_or_404
+
+from accounts.models import Account
+from organizations.models import Project
+from organizations.visibility import visible_to
+from .models import Transaction, Budget
+from .serializers import TransactionSerializer
+from .budgets import resolve_spent
+from .cash_flow import cash_flow
+from .categories import spend_by_ancestor
+
+
+class ReportError(Exception):
+    """Raised when a report cannot be generated from its parameters."""
+
+
+def build_report(report, user, progress=None):
+    """
+    Compute the data for a FinancialReport as seen by the given user.
+    progress, when given, is called with a rising percentage after the
+    transactions are scoped, as sections are aggregated and with 90 once
+    the data is serialized; the caller reports 100 when it has stored it.
+    """
+    def report_progress(percentage):
+        if progress:
+            progress(percentage)
+    
+    # Get report parameters
+    start_date = report.start_date
+    end_date = report.end_date
+    report_type = report.report_type
+    organization = report.organization
+    
+    # Base queryset for transactions
+    transactions = visible_to(Transaction.objects.all(), user).filter(
+        transaction_date__gte=start_date,
+        transaction_date__lte=end_date
+    )
+    
+    # Apply organization filter if needed
+    if organization:
+        transactions = transactions.filter(organization=organization)
+    report_progress(10)
+    
+    # Generate different reports based on type
+    if report_type == 'income_statement':
+        # Income statement report
+        income = transactions.filter(type='incoming', status='completed').aggregate(
+            total=Sum('amount')
+        )['total'] or 0
+        
+        expenses = transactions.filter(type='outgoing', status='completed').aggregate(
+            total=Sum('amount')
+        )['total'] or 0
+        report_progress(40)
+        
+        # Get expenses by category
+        expenses_by_category = list(transactions.filter(
+            type='outgoing', 
+            status='completed'
+        ).values(
+            'category__name'
+        ).annotate(
+            total=Sum('amount')
+        ).order_by('-total'))
+        report_progress(70)
+        
+        report_data = {
+            'income': income,
+            'expenses': expenses,
+            'net_income': income - expenses,
+            'expenses_by_category': expenses_by_category,
+            'expenses_by_category_tree': spend_by_ancestor(
+                transactions.filter(type='outgoing', status='completed')
+            )
+        }
+        
+    elif report_type == 'expense_report':
+        # Expense report
+        expenses = transactions.filter(type='outgoing', status='completed')
+        
+        total_expenses = expenses.aggregate(total=Sum('amount'))['total'] or 0
+        
+        # Get expenses by category
+        expenses_by_category = list(expenses.values(
+            'category__name'
+        ).annotate(
+            total=Sum('amount')
+        ).order_by('-total'))
+        expenses_by_category_tree = spend_by_ancestor(expenses)
+        report_progress(30)
+        
+        # Get expenses by date
+        expenses_by_date = list(expenses.values(
+            'transaction_date'
+        ).annotate(
+            total=Sum('amount')
+        ).order_by('transaction_date'))
+        report_progress(50)
+        
+        report_data = {
+            'total_expenses': total_expenses,
+            'expenses_by_category': expenses_by_category,
+            'expenses_by_category_tree': expenses_by_category_tree,
+            'expenses_by_date': expenses_by_date,
+            'transactions': TransactionSerializer(expenses, many=True).data
+        }
+        
+    elif report_type == 'cash_flow':
+        if organization:
+            # The organization's own flows across the accounts its transactions use. Those
+            # accounts belong to the members, so their balances are not used and only the
+            # requesting user's own accounts are broken down
+            account_ids = list(transactions.order_by().values_list('account_id', flat=True).distinct())
+            own_account_ids = Account.objects.filter(user=user, id__in=account_ids).values_list('id', flat=True)
+            report_progress(30)
+            
+            report_data = cash_flow(
+                transactions, account_ids, start_date, seed_balances=False, listed_account_ids=list(own_account_ids)
+            )
+        else:
+            # Cash flow of the user's accounts from their balances before the start date
+            account_ids = list(Account.objects.filter(user=user).values_list('id', flat=True))
+            report_progress(30)
+            
+            report_data = cash_flow(transactions, account_ids, start_date)
+        
+    elif report_type == 'budget_analysis':
+        # Budget analysis report
+        budgets = visible_to(Budget.objects.all(), user)
+        
+        if organization:
+            budgets = budgets.filter(organization=organization)
+        
+        budgets = resolve_spent(budgets.select_related('category'))
+        report_progress(60)
+        
+        budget_data = []
+        
+        for budget in budgets:
+            budget_data.append({
+                'title': budget.title,
+                'amount': budget.amount,
+                'spent': budget.spent,
+                'remaining': budget.remaining,
+                'percentage_used': budget.percentage_used,
+                'category': budget.category.name if budget.category else None,
+                'period': budget.get_period_display()
+            })
+        
+        report_data = {
+            'budgets': budget_data,
+            'total_budget': sum(b.amount for b in budgets),
+            'total_spent': sum(b.spent for b in budgets),
+            'total_remaining': sum(b.remaining for b in budgets)
+        }
+        
+    elif report_type == 'project_finance':
+        # Project finance report
+        project_id = report.parameters.get('project_id')
+        
+        if not project_id:
+            raise ReportError('Project ID is required for project finance report.')
+        
+        # Filter transactions for the project
+        project_transactions = transactions.filter(project_id=project_id)
+        
+        # Calculate income and expenses
+        income = project_transactions.filter(type='incoming', status='completed').aggregate(
+            total=Sum('amount')
+        )['total'] or 0
+        
+        expenses = project_transactions.filter(type='outgoing', status='completed').aggregate(
+            total=Sum('amount')
+        )['total'] or 0
+        report_progress(30)
+        
+        # Get project budget
+        project = get_object_or_404(Project.objects.with_financials(), id=project_id)
+        report_progress(50)
+        
+        report_data = {
+            'project': {
+                'id': project.id,
+                'name': project.name,
+                'budget': project.budget,
+                'budget_spent': project.budget_spent,
+                'budget_remaining': project.budget_remaining,
+                'budget_percentage': project.budget_percentage
+            },
+            'income': income,
+            'expenses': expenses,
+            'net': income - expenses,
+            'transactions': TransactionSerializer(project_transactions, many=True).data
+        }
+        
+    elif report_type == 'tax_report':
+        # Tax report
+        tax_deductible_expenses = transactions.filter(
+            type='outgoing',
+            status='completed',
+            category__is_tax_deductible=True
+        )
+        
+        total_tax_deductible = tax_deductible_expenses.aggregate(total=Sum('amount'))['total'] or 0
+        
+        # Group by category
+        expenses_by_category = list(tax_deductible_expenses.values(
+            'category__name'
+        ).annotate(
+            total=Sum('amount')
+        ).order_by('-total'))
+        expenses_by_category_tree = spend_by_ancestor(tax_deductible_expenses)
+        report_progress(50)
+        
+        report_data = {
+            'total_tax_deductible': total_tax_deductible,
+            'expenses_by_category': expenses_by_category,
+            'expenses_by_category_tree': expenses_by_category_tree,
+            'transactions': TransactionSerializer(tax_deductible_expenses, many=True).data
+        }
+        
+    else:
+        report_data = {
+            'error': 'Unsupported report type'
+        }
+    
+    # Serialization of the sections above is done; caching and storing remain
+    report_progress(90)
+    return report_data
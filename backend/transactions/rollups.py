@@ -0,0 +1,210 @@
+from decimal import Decimal
+
+from django.db import connections, router, transaction as db_transaction
+from django.db.models import F, Q, Sum, Count, Value, IntegerField
+from django.db.models.functions import Coalesce
+
+from organizations.visibility import visible_to
+
+# Fields of a transaction that decide which rollup row it lands in, how much
+# it adds and which account balances it moves
+ROLLUP_FIELDS = (
+    'user_id', 'account_id', 'category_id', 'organization_id', 'project_id',
+    'transaction_date', 'type', 'status', 'amount', 'destination_account_id',
+)
+
+KEY_FIELDS = ('user_id', 'account_id', 'category_id', 'organization_id', 'project_id', 'date')
+
+# The rollup key with NULLs coalesced to 0, so that rows without a category,
+# organization or project still collide in the unique constraint. The literal
+# is typed so the FK and the 0 never resolve to mixed types.
+KEY_EXPRESSIONS = (
+    F('user'),
+    F('account'),
+    Coalesce('category', Value(0, output_field=IntegerField())),
+    Coalesce('organization', Value(0, output_field=IntegerField())),
+    Coalesce('project', Value(0, output_field=IntegerField())),
+    F('date'),
+)
+
+# Adds to the row of a key or creates it, in one statement that concurrent
+# writers of the same new key cannot both insert. The conflict target must
+# match the rollup_unique_key index expressions.
+UPSERT_SQL = """
+INSERT INTO {table} (user_id, account_id, category_id, organization_id, project_id, date,
+                     income, expenses, transaction_count)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+ON CONFLICT (user_id, account_id, COALESCE(category_id, 0), COALESCE(organization_id, 0),
+             COALESCE(project_id, 0), date)
+DO UPDATE SET income = {table}.income + excluded.income,
+              expenses = {table}.expenses + excluded.expenses,
+              transaction_count = {table}.transaction_count + excluded.transaction_count
+"""
+
+
+def snapshot(transaction):
+    """Capture the rollup-relevant state of an in-memory transaction."""
+    from .models import Transaction
+
+    date_field = Transaction._meta.get_field('transaction_date')
+    amount_field = Transaction._meta.get_field('amount')
+    return {
+        'user_id': transaction.user_id,
+        'account_id': transaction.account_id,
+        'category_id': transaction.category_id,
+        'organization_id': transaction.organization_id,
+        'project_id': transaction.project_id,
+        'transaction_date': date_field.to_python(transaction.transaction_date),
+        'type': transaction.type,
+        'status': transaction.status,
+        'amount': amount_field.to_python(transaction.amount),
+        'destination_account_id': transaction.destination_account_id,
+    }
+
+
+def _contribution(state):
+    # Only completed income and expenses are rolled up, transfers move money between accounts
+    if not state or state['status'] != 'completed' or state['type'] not in ('incoming', 'outgoing'):
+        return None
+
+    key = (
+        state['user_id'], state['account_id'], state['category_id'],
+        state['organization_id'], state['project_id'], state['transaction_date'],
+    )
+    income = state['amount'] if state['type'] == 'incoming' else Decimal('0.00')
+    expenses = state['amount'] if state['type'] == 'outgoing' else Decimal('0.00')
+    return key, income, expenses
+
+
+def _apply(key, income, expenses, count):
+    from .models import DailyRollup
+
+    using = router.db_for_write(DailyRollup)
+    connection = connections[using]
+    opts = DailyRollup._meta
+    values = dict(zip(KEY_FIELDS, key), income=income, expenses=expenses, transaction_count=count)
+    params = [
+        opts.get_field(name.removesuffix('_id')).get_db_prep_save(values[name], connection)
+        for name in (*KEY_FIELDS, 'income', 'expenses', 'transaction_count')
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(UPSERT_SQL.format(table=connection.ops.quote_name(opts.db_table)), params)
+
+    # Drop rows whose last transaction moved out so they match a fresh aggregate
+    if count < 0:
+        DailyRollup.objects.using(using).filter(transaction_count=0, **dict(zip(KEY_FIELDS, key))).delete()
+
+
+def apply_change(old_state, new_state):
+    """
+    Move a transaction's contribution from its old rollup row to its new one.
+    Pass None as old_state for a create and as new_state for a delete.
+    """
+    old = _contribution(old_state)
+    new = _contribution(new_state)
+
+    if old and new and old[0] == new[0]:
+        income = new[1] - old[1]
+        expenses = new[2] - old[2]
+        if income or expenses:
+            _apply(new[0], income, expenses, 0)
+        return
+
+    if old:
+        _apply(old[0], -old[1], -old[2], -1)
+    if new:
+        _apply(new[0], new[1], new[2], 1)
+
+
+def accumulate(states, totals, sign=1):
+    """Sum the contributions of new (sign=1) or deleted (sign=-1) transactions per rollup row into totals."""
+    for state in states:
+        contribution = _contribution(state)
+        if contribution:
+            key, income, expenses = contribution
+            current = totals.get(key, (Decimal('0.00'), Decimal('0.00'), 0))
+            totals[key] = (current[0] + sign * income, current[1] + sign * expenses, current[2] + sign)
+    return totals
+
+
+def apply_totals(totals):
+    """Apply accumulated totals, one UPDATE or INSERT per distinct rollup row."""
+    for key, (income, expenses, count) in totals.items():
+        _apply(key, income, expenses, count)
+
+
+def fold_into_unset(field, ids):
+    """
+    Before categories or projects are deleted, move their rollup rows into
+    the rows without one, which is where SET_NULL leaves their transactions.
+    Nulling the rows in place would give two rows the same key.
+    """
+    from .models import DailyRollup
+
+    rows = DailyRollup.objects.filter(**{f'{field}__in': ids})
+    for row in rows.values(*KEY_FIELDS, 'income', 'expenses', 'transaction_count'):
+        key = tuple(None if name == field else row[name] for name in KEY_FIELDS)
+        _apply(key, row['income'], row['expenses'], row['transaction_count'])
+    rows.delete()
+
+
+def rollups_for(user, include_organizations=False, organization_ids=None):
+    """Rollup rows owned by the user, optionally including their organizations' rows."""
+    from .models import DailyRollup
+
+    if not include_organizations:
+        return DailyRollup.objects.filter(user=user)
+    return visible_to(DailyRollup.objects.all(), user, organization_ids)
+
+
+def aggregate(transactions):
+    """Rollup rows of the given transactions computed from scratch in one grouped query."""
+    return transactions.filter(
+        status='completed',
+        type__in=('incoming', 'outgoing')
+    ).values(
+        'user_id', 'account_id', 'category_id', 'organization_id', 'project_id', 'transaction_date'
+    ).annotate(
+        total_income=Sum('amount', filter=Q(type='incoming')),
+        total_expenses=Sum('amount', filter=Q(type='outgoing')),
+        total_count=Count('id')
+    ).order_by()
+
+
+def rebuild(user=None, batch_size=1000):
+    """Recompute rollup rows from the transactions table in a single grouped query."""
+    from .models import DailyRollup, Transaction
+
+    rollups = DailyRollup.objects.all()
+    transactions = Transaction.objects.all()
+    if user is not None:
+        rollups = rollups.filter(user=user)
+        transactions = transactions.filter(user=user)
+
+    created = 0
+    with db_transaction.atomic():
+        rollups.delete()
+
+        batch = []
+        for row in aggregate(transactions).iterator(chunk_size=batch_size):
+            batch.append(DailyRollup(
+                user_id=row['user_id'],
+                account_id=row['account_id'],
+                category_id=row['category_id'],
+                organization_id=row['organization_id'],
+                project_id=row['project_id'],
+                date=row['transaction_date'],
+                income=row['total_income'] or Decimal('0.00'),
+                expenses=row['total_expenses'] or Decimal('0.00'),
+                transaction_count=row['total_count']
+            ))
+            if len(batch) >= batch_size:
+                DailyRollup.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+
+        if batch:
+            DailyRollup.objects.bulk_create(batch)
+            created += len(batch)
+
+    return created
@@ -0,0 +1,138 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+FTS_TABLE = 'transactions_transaction_fts'
+SEARCH_COLUMNS = ('title', 'description', 'tags')
+
+# Kept in sync by triggers. SQLite drops a table's triggers whenever a
+# migration rebuilds it, so they are re-created after every migrate
+SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON transactions_transaction BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, tags)
+        VALUES (new.id, new.title, new.description, new.tags);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON transactions_transaction BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, tags)
+        VALUES ('delete', old.id, old.title, old.description, old.tags);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF title, description, tags
+    ON transactions_transaction BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, tags)
+        VALUES ('delete', old.id, old.title, old.description, old.tags);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, tags)
+        VALUES (new.id, new.title, new.description, new.tags);
+    END
+    """,
+]
+
+# Longer inputs are cut to this many terms so a pasted paragraph stays cheap
+MAX_TERMS = 8
+
+TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def _document(table):
+    # Same expression as the PostgreSQL GIN index, so the planner can use it
+    columns = [f"coalesce({table}.{column}, '')" for column in SEARCH_COLUMNS]
+    return "to_tsvector('simple'::regconfig, " + " || ' ' || ".join(columns) + ")"
+
+
+def search_terms(text):
+    return TERM.findall(text.lower())[:MAX_TERMS]
+
+
+def fts_available(connection):
+    """True when the database has the transaction search index from migration 0007."""
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor != 'sqlite':
+        return False
+    if not hasattr(connection, '_transaction_fts'):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            connection._transaction_fts = cursor.fetchone() is not None
+    return connection._transaction_fts
+
+
+def ensure_sqlite_triggers(using='default', **kwargs):
+    """post_migrate handler restoring the FTS triggers after a table rebuild."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        if cursor.fetchone() is None:
+            return
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+            [f'{FTS_TABLE}_%']
+        )
+        if cursor.fetchone()[0] == len(SQLITE_TRIGGERS):
+            return
+        for statement in SQLITE_TRIGGERS:
+            cursor.execute(statement)
+        # Rows written while the triggers were missing are picked up by a rebuild
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def full_text_search(queryset, text):
+    """
+    Restrict transactions to those whose title, description or tags contain
+    every term as a word prefix, annotated with search_rank (higher is more
+    relevant). Returns None when the database has no full-text index.
+    """
+    connection = connections[queryset.db]
+    if not fts_available(connection):
+        return None
+
+    terms = search_terms(text)
+    if not terms:
+        return queryset
+
+    table = connection.ops.quote_name(queryset.model._meta.db_table)
+    if connection.vendor == 'sqlite':
+        match = ' AND '.join(f'"{term}"*' for term in terms)
+        # Join the index once so the MATCH both filters the rows and ranks
+        # them; bm25 is lower for better matches
+        joined = queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = {table}.id', f'{FTS_TABLE} MATCH %s'],
+            params=[match]
+        )
+        return joined.annotate(search_rank=RawSQL(f'-bm25({FTS_TABLE})', (), output_field=FloatField()))
+
+    query = ' & '.join(f'{term}:*' for term in terms)
+    document = _document(table)
+    matches = RawSQL(f"{document} @@ to_tsquery('simple'::regconfig, %s)", (query,), output_field=BooleanField())
+    rank = RawSQL(f"ts_rank({document}, to_tsquery('simple'::regconfig, %s))", (query,), output_field=FloatField())
+    return queryset.filter(matches).annotate(search_rank=rank)
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    ?search= backed by the transaction full-text index, ordered by relevance
+    unless the client asks for another ordering. Falls back to the regular
+    icontains search over search_fields on databases without the index.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '')
+        if not text.strip():
+            return queryset
+
+        results = full_text_search(queryset, text)
+        if results is None:
+            return super().filter_queryset(request, queryset, view)
+        if 'search_rank' in results.query.annotations:
+            results = results.order_by('-search_rank', '-id')
+        return results
@@ -1,8 +1,10 @@
 from rest_framework import serializers
-from .models import Category, Transaction, Budget, FinancialReport
+from .models import Category, Transaction, Budget, FinancialReport, ReportJob
 from accounts.models import Account
 from organizations.models import Organization, Project
 from django.contrib.auth.models import User
+from .budgets import resolve_spent
+from .categories import is_descendant
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -15,6 +17,11 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'icon', 'color', 'created_at', 'organization', 
                  'is_business_expense', 'is_tax_deductible', 'parent']
         read_only_fields = ['created_at']
+    
+    def validate_parent(self, parent):
+        if parent and self.instance and is_descendant(parent.pk, self.instance.pk):
+            raise serializers.ValidationError('A category cannot be nested under itself or one of its subcategories.')
+        return parent
 
 class OrganizationSerializer(serializers.ModelSerializer):
     class Meta:
@@ -46,6 +53,11 @@ class TransactionSerializer(serializers.ModelSerializer):
                  'recurrence_end_date', 'reference_number', 'tags', 'destination_account']
         read_only_fields = ['timestamp']
 
+class TransactionListSerializer(TransactionSerializer):
+    """List rows leave out the description, which the list query does not load."""
+    class Meta(TransactionSerializer.Meta):
+        fields = [field for field in TransactionSerializer.Meta.fields if field != 'description']
+
 class TransactionDetailSerializer(TransactionSerializer):
     category = CategorySerializer(read_only=True)
     account = AccountSerializer(read_only=True)
@@ -56,6 +68,14 @@ class TransactionDetailSerializer(TransactionSerializer):
     class Meta(TransactionSerializer.Meta):
         pass
 
+class BudgetListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Resolve spend for every budget on the page with one query
+        budgets = list(data.all() if hasattr(data, 'all') else data)
+        if not all(hasattr(budget, '_spent') for budget in budgets):
+            budgets = resolve_spent(budgets)
+        return super().to_representation(budgets)
+
 class BudgetSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     organization_name = serializers.CharField(source='organization.name', read_only=True, allow_null=True)
@@ -71,6 +91,7 @@ class BudgetSerializer(serializers.ModelSerializer):
                  'organization', 'organization_name', 'project', 'project_name',
                  'spent', 'remaining', 'percentage_used']
         read_only_fields = ['created_at', 'updated_at', 'spent', 'remaining', 'percentage_used']
+        list_serializer_class = BudgetListSerializer
 
 class BudgetDetailSerializer(BudgetSerializer):
     category = CategorySerializer(read_only=True)
@@ -88,3 +109,12 @@ class FinancialReportSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'report_type', 'start_date', 'end_date', 
                  'created_at', 'organization', 'organization_name', 'parameters']
         read_only_fields = ['created_at']
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    report_title = serializers.CharField(source='report.title', read_only=True)
+    
+    class Meta:
+        model = ReportJob
+        fields = ['id', 'report', 'report_title', 'status', 'progress', 'error',
+                 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
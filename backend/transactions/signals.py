@@ -0,0 +1,79 @@
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import report_cache, rollups
+from .bulk import BulkTransactionWriter
+from .models import Category, Transaction
+
+
+# pre_delete also runs for categories and projects removed by a cascade,
+# before their SET_NULL updates are applied
+@receiver(pre_delete, sender=Category)
+def fold_category_rollups(sender, instance, **kwargs):
+    rollups.fold_into_unset('category_id', [instance.pk])
+
+
+@receiver(pre_delete, sender='organizations.Project')
+def fold_project_rollups(sender, instance, **kwargs):
+    rollups.fold_into_unset('project_id', [instance.pk])
+
+
+def _revert_balances(transactions):
+    writer = BulkTransactionWriter()
+    writer.remove(list(transactions.select_for_update().values(*rollups.ROLLUP_FIELDS)), with_rollups=False)
+    writer.finish()
+
+
+# Cascades and SET_NULL bypass Transaction.delete and save, so the balance
+# effects of the transactions they reach are taken out first. Their rollup
+# rows go with the same cascade.
+@receiver(pre_delete, sender='organizations.Organization')
+def revert_organization_transactions(sender, instance, **kwargs):
+    _revert_balances(Transaction.objects.filter(organization_id=instance.pk))
+
+
+@receiver(pre_delete, sender='accounts.Account')
+def revert_account_transactions(sender, instance, **kwargs):
+    # A transfer whose destination goes stops moving money, so its source is refunded now
+    _revert_balances(Transaction.objects.filter(Q(account_id=instance.pk) | Q(destination_account_id=instance.pk)))
+
+
+# Account, project and organization names are embedded in cached reports.
+# Deleting an account also cascades to its transactions without
+# Transaction.delete, so the reports that showed them go too.
+@receiver(post_save, sender='accounts.Account')
+@receiver(pre_delete, sender='accounts.Account')
+def account_changed(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    user_id = instance.user_id
+    organization_ids = list(
+        Transaction.objects.filter(account_id=instance.pk, organization__isnull=False)
+        .order_by().values_list('organization_id', flat=True).distinct()
+    )
+
+    def bump():
+        report_cache.bump_epoch(user_id)
+        for organization_id in organization_ids:
+            report_cache.bump_epoch(organization_id=organization_id)
+    db_transaction.on_commit(bump)
+
+
+@receiver(post_save, sender='organizations.Project')
+@receiver(post_delete, sender='organizations.Project')
+def project_changed(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    organization_id = instance.organization_id
+    db_transaction.on_commit(lambda: report_cache.bump_epoch(organization_id=organization_id))
+
+
+@receiver(post_save, sender='organizations.Organization')
+@receiver(post_delete, sender='organizations.Organization')
+def organization_changed(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    organization_id = instance.pk
+    db_transaction.on_commit(lambda: report_cache.bump_epoch(organization_id=organization_id))
@@ -0,0 +1,53 @@
+TAG_MAX_LENGTH = 50
+
+
+def parse_tags(value):
+    """Split a comma separated tags string into unique, lower-cased tag names, in order."""
+    names = []
+    for part in (value or '').split(','):
+        name = part.strip().lower()[:TAG_MAX_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def _tag_ids(names):
+    from .models import Tag
+
+    if not names:
+        return {}
+    Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+    return dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+
+
+def sync_tags(transaction):
+    """Make the transaction's tag rows match its tags field."""
+    from .models import TransactionTag
+
+    names = parse_tags(transaction.tags)
+    current = dict(
+        TransactionTag.objects.filter(transaction=transaction).values_list('tag__name', 'id')
+    )
+
+    removed = [row_id for name, row_id in current.items() if name not in names]
+    if removed:
+        TransactionTag.objects.filter(id__in=removed).delete()
+
+    added = [name for name in names if name not in current]
+    tag_ids = _tag_ids(added)
+    TransactionTag.objects.bulk_create([
+        TransactionTag(transaction=transaction, tag_id=tag_ids[name]) for name in added
+    ])
+
+
+def attach_many(transactions):
+    """Create tag rows for bulk-inserted transactions in a fixed number of queries."""
+    from .models import TransactionTag
+
+    names_by_transaction = [(transaction, parse_tags(transaction.tags)) for transaction in transactions]
+    tag_ids = _tag_ids(sorted({name for _, names in names_by_transaction for name in names}))
+    TransactionTag.objects.bulk_create([
+        TransactionTag(transaction=transaction, tag_id=tag_ids[name])
+        for transaction, names in names_by_transaction
+        for name in names
+    ])
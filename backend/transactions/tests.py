@@ -1,3 +1,1188 @@
-from django.test import TestCase
+import csv
+import json
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import skipIf, skipUnless
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from accounts.models import Account, BalanceCheckpoint
+from finance_project.renderers import ORJSONRenderer, msgpack, msgpack_available
+from goals.models import Goal
+from organizations.models import Organization, OrganizationMember, Project
+from . import categories, exports, jobs, recurrence, report_cache, rollups, search
+from .models import Category, CategoryClosure, DailyRollup, Transaction, Budget, FinancialReport, ReportJob, Tag
+from .reports import build_report
+
+
+class QueryPlanTests(APITestCase):
+    """
+    Runs EXPLAIN on every query the hot endpoints issue against the
+    transaction tables and fails if any of them falls back to a full scan.
+    """
+    TABLES = ('transactions_transaction', 'transactions_dailyrollup')
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.now().date()
+        cls.user = User.objects.create_user(username='planner', password='testpass123')
+        other = User.objects.create_user(username='other', password='testpass123')
+
+        cls.organization = Organization.objects.create(name='Plan Org', owner=cls.user)
+        OrganizationMember.objects.create(organization=cls.organization, user=cls.user, role='admin')
+        cls.project = Project.objects.create(
+            name='Plan Project', organization=cls.organization, start_date=today, budget=Decimal('1000.00')
+        )
+
+        for owner in (cls.user, other):
+            account = Account.objects.create(user=owner, title=f'{owner.username} checking', type='checking')
+            category = Category.objects.create(user=owner, name='Groceries', is_tax_deductible=True)
+            Budget.objects.create(user=owner, title='Food', amount=Decimal('500.00'), category=category)
+            Budget.objects.create(
+                user=owner, title='Project', amount=Decimal('800.00'),
+                organization=cls.organization, project=cls.project
+            )
+            for day in range(120):
+                Transaction.objects.create(
+                    user=owner,
+                    account=account,
+                    category=category,
+                    title=f'Transaction {day}',
+                    amount=Decimal('12.50'),
+                    type=('incoming', 'outgoing', 'transfer')[day % 3],
+                    status='pending' if day % 7 == 0 else 'completed',
+                    transaction_date=today - timedelta(days=day * 3),
+                    organization=cls.organization if owner == cls.user and day % 2 else None,
+                    project=cls.project if owner == cls.user and day % 4 == 1 else None,
+                )
+
+        cls.report = FinancialReport.objects.create(
+            user=cls.user,
+            organization=cls.organization,
+            title='Org expenses',
+            report_type='expense_report',
+            start_date=today - timedelta(days=90),
+            end_date=today
+        )
+
+    def setUp(self):
+        # Cached responses would hide the queries under test
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Small seeded tables make sequential scans cheap, so only take them when forced
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql)
+            else:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [str(row[-1]) for row in cursor.fetchall()]
+
+    def full_scans(self, plan):
+        scans = []
+        for line in plan:
+            for table in self.TABLES:
+                if line.strip().startswith(f'SCAN {table}') or f'Seq Scan on {table}' in line:
+                    scans.append(line)
+        return scans
+
+    def assertNoFullScans(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200, url)
+
+        checked = 0
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or not any(table in sql for table in self.TABLES):
+                continue
+            checked += 1
+            scans = self.full_scans(self.explain(sql))
+            self.assertFalse(scans, f'{url} runs a full scan: {scans}\n{sql}')
+        self.assertTrue(checked, f'{url} did not query the transaction tables')
+
+    def test_dashboard(self):
+        self.assertNoFullScans('/api/dashboard/')
+
+    def test_financial_summary(self):
+        self.assertNoFullScans('/api/dashboard/summary/?period=year')
+
+    def test_budget_summary(self):
+        self.assertNoFullScans('/api/budgets/summary/')
+
+    def test_transaction_list(self):
+        self.assertNoFullScans('/api/transactions/')
+
+    def test_transaction_summary(self):
+        self.assertNoFullScans('/api/transactions/summary/?period=year')
+
+    def test_transaction_export(self):
+        start_date = timezone.now().date() - timedelta(days=30)
+        self.assertNoFullScans(f'/api/transactions/export/?format=csv&start_date={start_date}')
+
+    def test_budget_list(self):
+        self.assertNoFullScans('/api/budgets/')
+
+    def test_organization_transaction_summary(self):
+        self.assertNoFullScans(f'/api/transactions/summary/?organization={self.organization.id}')
+
+    def test_organization_report(self):
+        self.assertNoFullScans(f'/api/reports/{self.report.id}/generate/')
+
+    def test_project_list(self):
+        self.assertNoFullScans('/api/organizations/projects/')
+
+
+class ListQueryCountTests(APITestCase):
+    """
+    List endpoints must run the same number of queries however many rows
+    they return, i.e. no per-row lookups of related objects.
+    """
+    LIST_URLS = (
+        '/api/transactions/',
+        '/api/budgets/',
+        '/api/categories/',
+        '/api/reports/',
+        '/api/goals/',
+        '/api/organizations/organizations/',
+        '/api/organizations/projects/',
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='lister', password='testpass123')
+        cls.account = Account.objects.create(user=cls.user, title='Checking', type='checking')
+        cls.rows = 0
+        cls.add_rows(2)
+
+    @classmethod
+    def add_rows(cls, count):
+        today = timezone.now().date()
+        for _ in range(count):
+            cls.rows += 1
+            organization = Organization.objects.create(name=f'Org {cls.rows}', owner=cls.user)
+            OrganizationMember.objects.create(organization=organization, user=cls.user, role='admin')
+            project = Project.objects.create(
+                name=f'Project {cls.rows}', organization=organization, manager=cls.user,
+                start_date=today, budget=Decimal('100.00')
+            )
+            category = Category.objects.create(user=cls.user, name=f'Category {cls.rows}')
+            Transaction.objects.create(
+                user=cls.user, account=cls.account, category=category, organization=organization,
+                project=project, title=f'Transaction {cls.rows}', amount=Decimal('5.00'), type='outgoing'
+            )
+            Budget.objects.create(
+                user=cls.user, title=f'Budget {cls.rows}', amount=Decimal('50.00'),
+                category=category, organization=organization, project=project
+            )
+            FinancialReport.objects.create(
+                user=cls.user, organization=organization, title=f'Report {cls.rows}', report_type='income_statement'
+            )
+            Goal.objects.create(
+                user=cls.user, title=f'Goal {cls.rows}', target_amount=Decimal('10.00'),
+                target_date=today, linked_account=cls.account
+            )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        # Cached responses and memberships would make the counts differ
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def test_list_query_counts_do_not_grow_with_rows(self):
+        before = {url: self.count_queries(url) for url in self.LIST_URLS}
+        self.add_rows(5)
+        after = {url: self.count_queries(url) for url in self.LIST_URLS}
+        self.assertEqual(before, after)
+
+
+
+class CursorPaginationTests(APITestCase):
+    """Walking the transaction list by cursor visits every row exactly once, in both directions."""
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.now().date()
+        cls.user = User.objects.create_user(username='pager', password='testpass123')
+        account = Account.objects.create(user=cls.user, title='Checking', type='checking')
+        # Several rows share each date and each amount, so only the id tie break keeps pages apart
+        for index in range(23):
+            Transaction.objects.create(
+                user=cls.user, account=account, title=f'Row {index}', type='outgoing',
+                amount=Decimal(index % 4 + 1), transaction_date=today - timedelta(days=index // 5)
+            )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([row['id'] for row in response.data['results']])
+            url = response.data[link]
+        return pages
+
+    def assertWalksMatch(self, ordering, key):
+        params = f'?page_size=4&ordering={ordering}' if ordering else '?page_size=4'
+        expected = [
+            transaction.id for transaction in sorted(Transaction.objects.all(), key=key)
+        ]
+
+        forward = self.walk('/api/transactions/' + params, 'next')
+        self.assertEqual([len(page) for page in forward], [4, 4, 4, 4, 4, 3])
+        self.assertEqual(sum(forward, []), expected)
+
+        # Back from the last page through the previous links
+        last = self.client.get('/api/transactions/' + params)
+        while last.data['next']:
+            last = self.client.get(last.data['next'])
+        backward = self.walk(last.data['previous'], 'previous')
+        self.assertEqual(sum(reversed(backward), []) + forward[-1], expected)
+
+    def test_default_order_breaks_date_ties_on_id(self):
+        self.assertWalksMatch(None, lambda t: (-t.transaction_date.toordinal(), -t.id))
+
+    def test_ordering_by_amount(self):
+        self.assertWalksMatch('amount', lambda t: (t.amount, t.id))
+        self.assertWalksMatch('-amount', lambda t: (-t.amount, -t.id))
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get('/api/transactions/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class RollupAssertionsMixin:
+    def assertRollupsMatch(self):
+        """The incrementally maintained rollup rows equal a fresh aggregate of the transactions table."""
+        expected = {
+            (row['user_id'], row['account_id'], row['category_id'], row['organization_id'],
+             row['project_id'], row['transaction_date']):
+            (row['total_income'] or Decimal('0.00'), row['total_expenses'] or Decimal('0.00'), row['total_count'])
+            for row in rollups.aggregate(Transaction.objects.all())
+        }
+        actual = {
+            tuple(row[name] for name in rollups.KEY_FIELDS): (row['income'], row['expenses'], row['transaction_count'])
+            for row in DailyRollup.objects.values(*rollups.KEY_FIELDS, 'income', 'expenses', 'transaction_count')
+        }
+        self.assertEqual(DailyRollup.objects.count(), len(actual))
+        self.assertEqual(actual, expected)
+
+
+class RollupConsistencyTests(RollupAssertionsMixin, APITestCase):
+    """
+    The incrementally maintained rollup rows must always equal a fresh
+    aggregate of the transactions table.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.now().date()
+        cls.user = User.objects.create_user(username='roller', password='testpass123')
+        cls.account = Account.objects.create(user=cls.user, title='Checking', type='checking')
+        cls.organization = Organization.objects.create(name='Roll Org', owner=cls.user)
+        cls.project = Project.objects.create(
+            name='Roll Project', organization=cls.organization, start_date=cls.today, budget=Decimal('100.00')
+        )
+        cls.food = Category.objects.create(user=cls.user, name='Food')
+        cls.travel = Category.objects.create(user=cls.user, name='Travel')
+
+    def add(self, amount, **fields):
+        fields.setdefault('category', self.food)
+        fields.setdefault('type', 'outgoing')
+        return Transaction.objects.create(
+            user=self.user, account=self.account, title='Rolled', amount=Decimal(amount), **fields
+        )
+
+    def test_create_update_and_delete(self):
+        first = self.add('10.00')
+        second = self.add('6.00', type='incoming', organization=self.organization, project=self.project)
+        self.add('3.00', status='pending')
+        self.assertRollupsMatch()
+
+        first.amount = Decimal('12.00')
+        first.save()
+        second.category = self.travel
+        second.transaction_date = self.today - timedelta(days=2)
+        second.save()
+        self.assertRollupsMatch()
+
+        first.status = 'failed'
+        first.save()
+        second.delete()
+        self.assertRollupsMatch()
+
+    def test_category_delete_merges_into_uncategorized(self):
+        self.add('10.00')
+        self.add('7.00', category=self.travel)
+        self.add('4.00', category=None)
+        self.food.delete()
+        self.assertRollupsMatch()
+
+        # Later writes land on the single uncategorized row
+        self.add('5.00', category=None)
+        self.assertRollupsMatch()
+
+    def test_project_delete_merges_rows(self):
+        self.add('10.00', organization=self.organization, project=self.project)
+        self.add('2.00', organization=self.organization)
+        self.project.delete()
+        self.assertRollupsMatch()
+
+    def test_owner_delete_cascades_merged_rows(self):
+        self.add('10.00')
+        self.add('2.00', category=None)
+        self.user.delete()
+        self.assertFalse(DailyRollup.objects.exists())
+
+    def test_repeated_first_writes_share_one_row(self):
+        key = (self.user.pk, self.account.pk, None, None, None, self.today)
+        rollups.apply_totals({key: (Decimal('1.00'), Decimal('0.00'), 1)})
+        rollups.apply_totals({key: (Decimal('2.00'), Decimal('0.00'), 1)})
+        row = DailyRollup.objects.get()
+        self.assertEqual((row.income, row.transaction_count), (Decimal('3.00'), 2))
+
+    def test_unique_key_validates_with_null_parts(self):
+        self.add('10.00', category=None)
+        duplicate = DailyRollup(user=self.user, account=self.account, date=self.today)
+        with self.assertRaises(ValidationError):
+            duplicate.validate_constraints()
+
+        DailyRollup(user=self.user, account=self.account, category=self.food, date=self.today).validate_constraints()
+
+
+class ReportJobProgressTests(APITestCase):
+    """Report jobs move through intermediate progress values before completing."""
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.now().date()
+        cls.user = User.objects.create_user(username='reporter', password='testpass123')
+        account = Account.objects.create(user=cls.user, title='Checking', type='checking')
+        organization = Organization.objects.create(name='Report Org', owner=cls.user)
+        cls.project = Project.objects.create(
+            name='Report Project', organization=organization, start_date=today, budget=Decimal('100.00')
+        )
+        category = Category.objects.create(user=cls.user, name='Office', is_tax_deductible=True)
+        Budget.objects.create(user=cls.user, title='Office', amount=Decimal('50.00'), category=category)
+        for kind in ('incoming', 'outgoing'):
+            Transaction.objects.create(
+                user=cls.user, account=account, category=category, project=cls.project,
+                title=kind, amount=Decimal('20.00'), type=kind
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def make_report(self, report_type):
+        today = timezone.now().date()
+        return FinancialReport.objects.create(
+            user=self.user, title=report_type, report_type=report_type,
+            start_date=today - timedelta(days=30), end_date=today,
+            parameters={'project_id': self.project.id} if report_type == 'project_finance' else {}
+        )
+
+    def test_build_reports_intermediate_progress(self):
+        for report_type, _ in FinancialReport.REPORT_TYPES:
+            with self.subTest(report_type=report_type):
+                reported = []
+                build_report(self.make_report(report_type), self.user, progress=reported.append)
+                self.assertEqual(reported, sorted(set(reported)))
+                self.assertGreaterEqual(len(reported), 3)
+                self.assertEqual(reported[-1], 90)
+
+    def test_job_progress_is_stored_until_completion(self):
+        job = jobs.enqueue_report(self.make_report('expense_report'), self.user)
+        claimed = jobs.claim_next_job()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(jobs.run_job(claimed))
+
+        # Each intermediate value is its own UPDATE, visible to the status endpoint while the job runs
+        progress_updates = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "transactions_reportjob" SET "progress"')
+        ]
+        self.assertGreaterEqual(len(progress_updates), 3)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress), ('completed', 100))
+
+    def test_generating_keeps_the_report_parameters(self):
+        report = self.make_report('project_finance')
+        self.client.force_authenticate(self.user)
+        url = f'/api/reports/{report.id}/generate/'
+
+        for _ in range(2):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(Decimal(str(response.data['income'])), Decimal('20.00'))
+
+        for _ in range(2):
+            jobs.enqueue_report(report, self.user)
+            self.assertTrue(jobs.run_job(jobs.claim_next_job()))
+        self.assertEqual(ReportJob.objects.filter(status='completed').count(), 2)
+
+        report.refresh_from_db()
+        self.assertEqual(report.parameters, {'project_id': self.project.id})
+
+
+class ReportCacheTests(APITestCase):
+    """Cached reports are keyed by the requesting user and invalidated by renames."""
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.now().date()
+        cls.owner = User.objects.create_user(username='cache-owner', password='testpass123')
+        cls.member = User.objects.create_user(username='cache-member', password='testpass123')
+        cls.organization = Organization.objects.create(name='Cache Org', owner=cls.owner)
+        OrganizationMember.objects.create(organization=cls.organization, user=cls.owner, role='admin')
+        cls.membership = OrganizationMember.objects.create(
+            organization=cls.organization, user=cls.member, role='member'
+        )
+        cls.project = Project.objects.create(
+            name='Cache Project', organization=cls.organization, start_date=today, budget=Decimal('10.00')
+        )
+        cls.account = Account.objects.create(user=cls.owner, title='Checking', type='checking')
+        Transaction.objects.create(
+            user=cls.owner, account=cls.account, organization=cls.organization, project=cls.project,
+            title='Org expense', amount=Decimal('4.00'), type='outgoing'
+        )
+        cls.report = FinancialReport.objects.create(
+            user=cls.owner, organization=cls.organization, title='Org expenses', report_type='expense_report',
+            start_date=today - timedelta(days=7), end_date=today
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def assertKeyChanges(self, user, change):
+        before = report_cache.report_cache_key(self.report, user)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertNotEqual(report_cache.report_cache_key(self.report, user), before)
+
+    def test_key_depends_on_requesting_user_and_membership(self):
+        self.assertNotEqual(
+            report_cache.report_cache_key(self.report, self.owner),
+            report_cache.report_cache_key(self.report, self.member)
+        )
+        self.assertKeyChanges(self.member, self.membership.delete)
+
+    def test_renames_invalidate_cached_reports(self):
+        def rename(instance, field):
+            def change():
+                setattr(instance, field, getattr(instance, field) + ' renamed')
+                instance.save()
+            return change
+
+        self.assertKeyChanges(self.owner, rename(self.account, 'title'))
+        self.assertKeyChanges(self.owner, rename(self.project, 'name'))
+        self.assertKeyChanges(self.owner, rename(self.organization, 'name'))
+
+    def test_worker_skips_a_process_local_cache(self):
+        stale = {'total_expenses': 'stale'}
+        cache.set(report_cache.report_cache_key(self.report, self.owner), stale)
+
+        self.assertFalse(report_cache.is_shared())
+        jobs.enqueue_report(self.report, self.owner)
+        self.assertTrue(jobs.run_job(jobs.claim_next_job()))
+        self.assertEqual(Decimal(ReportJob.objects.get().result['total_expenses']), Decimal('4.00'))
+
+        # With a shared cache the worker reads it like the web process does
+        with mock.patch.object(report_cache, 'is_shared', return_value=True):
+            jobs.enqueue_report(self.report, self.owner)
+            self.assertTrue(jobs.run_job(jobs.claim_next_job()))
+        self.assertEqual(ReportJob.objects.latest('id').result, stale)
+
+
+class BalanceMaintenanceTests(APITestCase):
+    """
+    Transaction writes move account balances by in-place deltas; after any
+    sequence of writes each balance must equal its opening balance plus a
+    sum recomputed from the transactions table.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='balancer', password='testpass123')
+        cls.checking = Account.objects.create(
+            user=cls.user, title='Checking', type='checking', balance=Decimal('100.00')
+        )
+        cls.savings = Account.objects.create(
+            user=cls.user, title='Savings', type='savings', balance=Decimal('50.00')
+        )
+        cls.opening = {cls.checking.pk: Decimal('100.00'), cls.savings.pk: Decimal('50.00')}
+
+    def add(self, amount, kind, account=None, **fields):
+        return Transaction.objects.create(
+            user=self.user, account=account or self.checking, title=kind, amount=Decimal(amount), type=kind, **fields
+        )
+
+    def assertBalancesMatch(self):
+        balances = dict(Account.objects.values_list('id', 'balance'))
+        expected = {account_id: opening for account_id, opening in self.opening.items() if account_id in balances}
+        for transaction in Transaction.objects.filter(status='completed'):
+            if transaction.type == 'incoming':
+                expected[transaction.account_id] += transaction.amount
+            elif transaction.type == 'outgoing':
+                expected[transaction.account_id] -= transaction.amount
+            elif transaction.destination_account_id:
+                expected[transaction.account_id] -= transaction.amount
+                expected[transaction.destination_account_id] += transaction.amount
+        self.assertEqual(balances, expected)
+
+    def test_create_update_and_delete(self):
+        income = self.add('40.00', 'incoming')
+        expense = self.add('15.00', 'outgoing')
+        transfer = self.add('20.00', 'transfer', destination_account=self.savings)
+        self.add('99.00', 'outgoing', status='pending')
+        self.assertBalancesMatch()
+
+        income.amount = Decimal('45.00')
+        income.save()
+        expense.type = 'incoming'
+        expense.save()
+        transfer.status = 'failed'
+        transfer.save()
+        self.assertBalancesMatch()
+
+        transfer.status = 'completed'
+        transfer.save()
+        income.delete()
+        self.assertBalancesMatch()
+
+    def test_move_between_accounts(self):
+        expense = self.add('12.00', 'outgoing')
+        transfer = self.add('8.00', 'transfer', destination_account=self.savings)
+
+        expense.account = self.savings
+        expense.save()
+        transfer.account, transfer.destination_account = self.savings, self.checking
+        transfer.save()
+        self.assertBalancesMatch()
+
+    def test_organization_delete_reverts_member_balances(self):
+        member = User.objects.create_user(username='balance-member', password='testpass123')
+        wallet = Account.objects.create(user=member, title='Wallet', type='cash', balance=Decimal('30.00'))
+        self.opening = {**self.opening, wallet.pk: Decimal('30.00')}
+        organization = Organization.objects.create(name='Balance Org', owner=self.user)
+        checkpoint_date = timezone.now().date()
+        self.add('25.00', 'outgoing', organization=organization, transaction_date=checkpoint_date - timedelta(days=3))
+        Transaction.objects.create(
+            user=member, account=wallet, organization=organization, title='Org income',
+            amount=Decimal('10.00'), type='incoming'
+        )
+        self.add('20.00', 'transfer', destination_account=self.savings, organization=organization)
+        self.add('7.00', 'outgoing')
+        BalanceCheckpoint.objects.create(account=self.checking, date=checkpoint_date - timedelta(days=1), balance=Decimal('75.00'))
+
+        organization.delete()
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertBalancesMatch()
+        self.assertEqual(BalanceCheckpoint.objects.get().balance, Decimal('100.00'))
+
+    def test_destination_delete_refunds_the_source(self):
+        cash = Account.objects.create(user=self.user, title='Cash', type='cash')
+        self.opening = {**self.opening, cash.pk: Decimal('0.00')}
+        transfer = self.add('20.00', 'transfer', destination_account=cash)
+        self.add('5.00', 'outgoing', account=cash)
+        self.add('8.00', 'transfer', account=cash, destination_account=self.savings)
+
+        cash.delete()
+        transfer.refresh_from_db()
+        self.assertIsNone(transfer.destination_account_id)
+        self.assertBalancesMatch()
+
+        # Later edits and deletes of the orphaned transfer move nothing
+        transfer.amount = Decimal('25.00')
+        transfer.save()
+        self.assertBalancesMatch()
+        transfer.delete()
+        self.assertBalancesMatch()
+
+    def test_queryset_delete_reverts_balances_and_rollups(self):
+        self.add('40.00', 'incoming')
+        self.add('15.00', 'outgoing')
+        self.add('20.00', 'transfer', destination_account=self.savings)
+        kept = self.add('5.00', 'outgoing', account=self.savings)
+
+        Transaction.objects.exclude(pk=kept.pk).delete()
+        self.assertBalancesMatch()
+        self.assertEqual(list(DailyRollup.objects.values_list('expenses', flat=True)), [Decimal('5.00')])
+
+    def test_queryset_update_of_balance_fields_is_refused(self):
+        self.add('40.00', 'incoming')
+        for values in ({'amount': Decimal('1.00')}, {'account_id': self.savings.pk}, {'status': 'failed'}):
+            with self.subTest(values=values), self.assertRaises(ValueError):
+                Transaction.objects.update(**values)
+        self.assertBalancesMatch()
+
+        # Fields that move no money can still be updated in bulk
+        self.assertEqual(Transaction.objects.update(description='Bulk note'), 1)
+
+
+class TransactionExportTests(APITestCase):
+    """Every export format streams the same visible, date-filtered rows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='exporter', password='testpass123')
+        other = User.objects.create_user(username='stranger', password='testpass123')
+        account = Account.objects.create(user=cls.user, title='Checking', type='checking')
+        category = Category.objects.create(user=cls.user, name='Food')
+        cls.first = Transaction.objects.create(
+            user=cls.user, account=account, category=category, title='Lunch, with "friends"',
+            amount=Decimal('12.50'), type='outgoing', transaction_date=date(2024, 1, 5)
+        )
+        cls.second = Transaction.objects.create(
+            user=cls.user, account=account, title='Salary', amount=Decimal('1000.00'),
+            type='incoming', transaction_date=date(2024, 1, 20), reference_number='PAY-1'
+        )
+        Transaction.objects.create(
+            user=cls.user, account=account, title='Later', amount=Decimal('1.00'),
+            type='outgoing', transaction_date=date(2024, 3, 1)
+        )
+        Transaction.objects.create(
+            user=other, account=Account.objects.create(user=other, title='Other', type='checking'),
+            title='Not mine', amount=Decimal('5.00'), type='outgoing', transaction_date=date(2024, 1, 10)
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def export(self, format_type):
+        response = self.client.get('/api/transactions/export/', {
+            'format': format_type, 'start_date': '2024-01-01', 'end_date': '2024-01-31'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv(self):
+        response, content = self.export('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('transactions.csv', response['Content-Disposition'])
+        rows = list(csv.reader(StringIO(content.decode())))
+        self.assertEqual(rows[0][:4], ['Date', 'Title', 'Amount', 'Type'])
+        self.assertEqual(rows[1:], [
+            ['2024-01-05', 'Lunch, with "friends"', '12.50', 'Outgoing', 'Food', 'Checking', 'Completed',
+             '', '', '', ''],
+            ['2024-01-20', 'Salary', '1000.00', 'Incoming', '', 'Checking', 'Completed', '', '', '', 'PAY-1'],
+        ])
+
+    def test_ndjson(self):
+        response, content = self.export('ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.first.id, self.second.id])
+        self.assertEqual(rows[0]['amount'], '12.50')
+        self.assertEqual(rows[0]['category'], 'Food')
+        self.assertEqual(rows[1]['transaction_date'], '2024-01-20')
+
+    def assertColumnar(self, table):
+        self.assertEqual(table.column('id').to_pylist(), [self.first.id, self.second.id])
+        self.assertEqual(table.column('amount').to_pylist(), [Decimal('12.50'), Decimal('1000.00')])
+        self.assertEqual(table.column('transaction_date').to_pylist(), [date(2024, 1, 5), date(2024, 1, 20)])
+
+    @skipUnless(exports.columnar_available(), 'pyarrow is not installed')
+    def test_parquet(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        _, content = self.export('parquet')
+        self.assertColumnar(pq.read_table(pa.BufferReader(content)))
+
+    @skipUnless(exports.columnar_available(), 'pyarrow is not installed')
+    def test_arrow(self):
+        import pyarrow as pa
+
+        _, content = self.export('arrow')
+        self.assertColumnar(pa.ipc.open_stream(content).read_all())
+
+    def test_columnar_formats_without_pyarrow(self):
+        with mock.patch.object(exports, 'columnar_available', return_value=False):
+            for format_type in ('parquet', 'arrow'):
+                with self.subTest(format=format_type):
+                    response = self.client.get('/api/transactions/export/', {'format': format_type})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('pyarrow', response.data['detail'])
+
+
+class TransactionImportTests(RollupAssertionsMixin, APITestCase):
+    """Bulk CSV and OFX imports validate untrusted rows and keep balances and rollups exact."""
+
+    OFX = """OFXHEADER:100
+DATA:OFXSGML
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240105120000<TRNAMT>-42.10<FITID>A1<NAME>Grocer<MEMO>Weekly shop
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240107<TRNAMT>1500.00<FITID>A2<NAME>Salary
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240105<TRNAMT>-42.10<FITID>A1<NAME>Grocer again
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>2024XX09<TRNAMT>-1.00<FITID>A3<NAME>Broken date
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='importer', password='testpass123')
+        cls.account = Account.objects.create(
+            user=cls.user, title='Checking', type='checking', balance=Decimal('100.00')
+        )
+        cls.category = Category.objects.create(user=cls.user, name='Food')
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content, name='statement.csv', **data):
+        upload = SimpleUploadedFile(name, content.encode() if isinstance(content, str) else content)
+        return self.client.post(
+            '/api/transactions/import/', {'file': upload, 'account': self.account.id, **data}, format='multipart'
+        )
+
+    def test_csv_bad_rows_are_reported_and_skipped(self):
+        response = self.upload(
+            'date,title,amount,type,category,status\n'
+            '2024-01-02,Lunch,12.50,outgoing,food,completed\n'
+            'yesterday,Bad date,5.00,outgoing,,\n'
+            '2024-01-03,Bad amount,abc,outgoing,,\n'
+            '2024-01-03,Bad type,5.00,gift,,\n'
+            '2024-01-03,Bad status,5.00,incoming,,lost\n'
+            f'2024-01-04,{"x" * 101},5.00,incoming,,\n'
+            '2024-01-05,Refund,"1,000.00",,,\n'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['imported'], response.data['error_count']), (2, 5))
+        self.assertEqual([error['row'] for error in response.data['errors']], [3, 4, 5, 6, 7])
+
+        lunch = Transaction.objects.get(title='Lunch')
+        self.assertEqual((lunch.category, lunch.amount, lunch.type), (self.category, Decimal('12.50'), 'outgoing'))
+        self.assertEqual(Transaction.objects.get(title='Refund').amount, Decimal('1000.00'))
+
+    def test_unusable_files_are_rejected(self):
+        for content in ('title,type\nLunch,outgoing\n', '', b'\xff\xfe\x00garbage\x00'):
+            with self.subTest(content=content):
+                self.assertEqual(self.upload(content).status_code, 400)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_ofx_entries_are_parsed(self):
+        response = self.upload(self.OFX, name='statement.ofx')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['error_count'], 1)
+
+        grocer = Transaction.objects.get(reference_number='A1')
+        self.assertEqual(
+            (grocer.title, grocer.description, grocer.amount, grocer.type, str(grocer.transaction_date)),
+            ('Grocer', 'Weekly shop', Decimal('42.10'), 'outgoing', '2024-01-05')
+        )
+        salary = Transaction.objects.get(reference_number='A2')
+        self.assertEqual((salary.amount, salary.type), (Decimal('1500.00'), 'incoming'))
+
+    def test_duplicate_fitids_are_skipped(self):
+        first = self.upload(self.OFX, name='statement.ofx')
+        # A1 appears twice in the file
+        self.assertEqual((first.data['imported'], first.data['skipped']), (2, 1))
+
+        again = self.upload(self.OFX, name='statement.ofx')
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual((again.data['imported'], again.data['skipped']), (0, 3))
+        self.assertEqual(Transaction.objects.count(), 2)
+
+    def test_import_updates_balances_and_rollups(self):
+        self.upload(self.OFX, name='statement.ofx')
+        self.upload(
+            'date,title,amount,type,status\n'
+            '2024-01-05,Coffee,3.40,outgoing,completed\n'
+            '2024-01-06,Pending,99.00,outgoing,pending\n'
+            '2024-01-06,Gift,20.00,incoming,completed\n'
+        )
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('100.00') - Decimal('42.10') + Decimal('1500.00')
+                         - Decimal('3.40') + Decimal('20.00'))
+        self.assertRollupsMatch()
+
+
+class RecurrenceMaterializationTests(RollupAssertionsMixin, APITestCase):
+    """Materializing recurring transactions is idempotent and survives existing occurrences."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.now().date()
+        cls.user = User.objects.create_user(username='recurrer', password='testpass123')
+        cls.account = Account.objects.create(user=cls.user, title='Checking', type='checking')
+        cls.templates = [
+            Transaction.objects.create(
+                user=cls.user, account=cls.account, title=f'Rent {weeks}', amount=Decimal('10.00'),
+                type='outgoing', is_recurring=True, recurrence_type='weekly',
+                transaction_date=cls.today - timedelta(weeks=weeks)
+            )
+            for weeks in (3, 5)
+        ]
+
+    def balance(self):
+        self.account.refresh_from_db()
+        return self.account.balance
+
+    def test_running_twice_creates_nothing_new(self):
+        self.assertEqual(recurrence.materialize_due(self.today, batch_size=1), (2, 8, 0))
+        balance = self.balance()
+
+        self.assertEqual(recurrence.materialize_due(self.today, batch_size=1), (0, 0, 0))
+        self.assertEqual(Transaction.objects.filter(recurrence_template__isnull=False).count(), 8)
+        self.assertEqual(self.balance(), balance)
+        self.assertEqual(balance, Decimal('-100.00'))
+        self.assertRollupsMatch()
+
+    def test_existing_occurrences_are_skipped_not_the_batch(self):
+        recurrence.materialize_due(self.today - timedelta(weeks=1))
+        # Lose one template's high-water mark, so the next run regenerates its occurrences
+        Transaction.objects.filter(pk=self.templates[0].pk).update(recurrence_next_date=None)
+
+        with self.assertLogs('transactions.recurrence', 'WARNING'):
+            templates, created, skipped = recurrence.materialize_due(self.today)
+        self.assertEqual((templates, created, skipped), (2, 2, 2))
+        self.assertEqual(Transaction.objects.filter(recurrence_template__isnull=False).count(), 8)
+        self.assertEqual(self.balance(), Decimal('-100.00'))
+        self.assertRollupsMatch()
+
+
+class TransactionSearchTests(APITestCase):
+    """?search= goes through the full-text index, which triggers keep in step with the table."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='searcher', password='testpass123')
+        cls.account = Account.objects.create(user=cls.user, title='Checking', type='checking')
+
+    def setUp(self):
+        if not search.fts_available(connection):
+            self.skipTest('SQLite was built without FTS5')
+        self.client.force_authenticate(self.user)
+
+    def add(self, title, **fields):
+        return Transaction.objects.create(
+            user=self.user, account=self.account, title=title, amount=Decimal('1.00'), type='outgoing', **fields
+        )
+
+    def found(self, text, **params):
+        response = self.client.get('/api/transactions/', {'search': text, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_index_follows_inserts_updates_and_deletes(self):
+        transaction = self.add('Supplies', description='Quarterly invoice', tags='office')
+        self.assertEqual(self.found('invoice'), [transaction.id])
+        self.assertEqual(self.found('office'), [transaction.id])
+
+        transaction.description = 'Printer receipt'
+        transaction.save()
+        self.assertEqual(self.found('invoice'), [])
+        self.assertEqual(self.found('receipt'), [transaction.id])
+
+        transaction.delete()
+        self.assertEqual(self.found('receipt'), [])
+        self.assertEqual(self.found('supplies'), [])
+
+    def test_terms_match_word_prefixes(self):
+        invoice = self.add('Invoice 42', description='Consulting')
+        self.add('Groceries')
+        self.assertEqual(self.found('invo'), [invoice.id])
+        self.assertEqual(self.found('invo consult'), [invoice.id])
+        self.assertEqual(self.found('voice'), [])
+
+    def test_results_are_ordered_by_relevance(self):
+        weak = self.add('Coffee', description='beans, filters, mugs, grinder and a descaling kit')
+        strong = self.add('Coffee', description='coffee coffee')
+        self.assertEqual(self.found('coffee'), [strong.id, weak.id])
+        self.assertEqual(self.found('coffee', page_size=1)[0], strong.id)
+
+        # Walking ranked pages reaches every match once
+        response = self.client.get('/api/transactions/', {'search': 'coffee', 'page_size': 1})
+        seen = [row['id'] for row in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen += [row['id'] for row in response.data['results']]
+        self.assertEqual(seen, [strong.id, weak.id])
+
+    def test_index_is_matched_once_per_query(self):
+        self.add('Rent')
+        queryset = search.full_text_search(Transaction.objects.all(), 'rent')
+        self.assertEqual(str(queryset.query).count('MATCH'), 1)
+        self.assertEqual(queryset.get().title, 'Rent')
+
+    def test_falls_back_to_icontains_without_the_index(self):
+        invoice = self.add('Invoice 42')
+        with mock.patch.object(search, 'fts_available', return_value=False):
+            # icontains also matches inside words, unlike the index
+            self.assertEqual(self.found('voice'), [invoice.id])
+            self.assertEqual(self.found('rent'), [])
+
+
+class TransactionTagTests(APITestCase):
+    """The normalized tag rows follow the tags field and back the tag filter and spend by tag."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tagger', password='testpass123')
+        cls.account = Account.objects.create(user=cls.user, title='Checking', type='checking')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def add(self, amount, tags, **fields):
+        fields.setdefault('type', 'outgoing')
+        return Transaction.objects.create(
+            user=self.user, account=self.account, title='Tagged', amount=Decimal(amount), tags=tags, **fields
+        )
+
+    def tag_names(self, transaction):
+        return sorted(transaction.tag_set.values_list('name', flat=True))
+
+    def test_tags_are_normalized_and_deduplicated(self):
+        first = self.add('1.00', ' Food, TRAVEL,food ,, travel')
+        second = self.add('1.00', 'food')
+        self.assertEqual(self.tag_names(first), ['food', 'travel'])
+        self.assertEqual(self.tag_names(second), ['food'])
+        self.assertEqual(sorted(Tag.objects.values_list('name', flat=True)), ['food', 'travel'])
+
+    def test_update_adds_and_removes_tags(self):
+        transaction = self.add('1.00', 'food,travel')
+        transaction.tags = 'travel, work'
+        transaction.save()
+        self.assertEqual(self.tag_names(transaction), ['travel', 'work'])
+
+        transaction.tags = ''
+        transaction.save()
+        self.assertEqual(self.tag_names(transaction), [])
+
+    def test_tags_filter_matches_any_tag(self):
+        food = self.add('1.00', 'food')
+        travel = self.add('1.00', 'travel,work')
+        self.add('1.00', 'rent')
+        self.add('1.00', '')
+
+        response = self.client.get('/api/transactions/', {'tags': 'Food, travel'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(row['id'] for row in response.data['results']), [food.id, travel.id])
+
+    def test_spend_by_tag_totals(self):
+        self.add('10.00', 'food,travel')
+        self.add('5.50', 'food')
+        self.add('7.00', 'travel', status='pending')
+        self.add('3.00', 'food', type='incoming')
+
+        response = self.client.get('/api/transactions/spend_by_tag/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['tag'], Decimal(str(row['total'])), row['count']) for row in response.data['tags']],
+            [('food', Decimal('15.50'), 2), ('travel', Decimal('10.00'), 1)]
+        )
+
+
+class CategoryHierarchyTests(APITestCase):
+    """The closure table always holds exactly the (ancestor, descendant, depth) triples of the parent chains."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='gardener', password='testpass123')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+        # home > food > groceries > produce, home > rent, travel
+        self.home = self.make('Home')
+        self.food = self.make('Food', self.home)
+        self.groceries = self.make('Groceries', self.food)
+        self.produce = self.make('Produce', self.groceries)
+        self.rent = self.make('Rent', self.home)
+        self.travel = self.make('Travel')
+
+    def make(self, name, parent=None):
+        return Category.objects.create(user=self.user, name=name, parent=parent)
+
+    def assertClosureMatchesParents(self):
+        parents = dict(Category.objects.values_list('id', 'parent_id'))
+        expected = set()
+        for category_id in parents:
+            ancestor_id, depth = category_id, 0
+            while ancestor_id is not None:
+                expected.add((ancestor_id, category_id, depth))
+                ancestor_id, depth = parents[ancestor_id], depth + 1
+        self.assertEqual(set(CategoryClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth')), expected)
+
+    def reparent(self, category, parent):
+        category.parent = parent
+        category.save()
+
+    def test_created_tree(self):
+        self.assertClosureMatchesParents()
+
+    def test_move_subtree_under_new_parent(self):
+        self.reparent(self.groceries, self.travel)
+        self.assertClosureMatchesParents()
+        self.reparent(self.home, self.produce)
+        self.assertClosureMatchesParents()
+
+    def test_detach_subtree_to_root(self):
+        self.reparent(self.food, None)
+        self.assertClosureMatchesParents()
+        self.assertFalse(categories.is_descendant(self.produce.pk, self.home.pk))
+
+    def test_delete_middle_node(self):
+        self.food.delete()
+        self.groceries.refresh_from_db()
+        self.assertIsNone(self.groceries.parent_id)
+        self.assertClosureMatchesParents()
+
+        response = self.client.delete(f'/api/categories/{self.home.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertClosureMatchesParents()
+
+    def test_cannot_nest_under_own_subcategory(self):
+        with self.assertRaises(ValidationError):
+            self.reparent(self.food, self.produce)
+        response = self.client.patch(f'/api/categories/{self.home.id}/', {'parent': self.groceries.id})
+        self.assertEqual(response.status_code, 400)
+        self.assertClosureMatchesParents()
+
+    def test_tree_endpoint_nests_subcategories(self):
+        self.reparent(self.groceries, self.travel)
+
+        def shape(nodes):
+            return [(node['name'], shape(node['subcategories'])) for node in nodes]
+
+        response = self.client.get('/api/categories/tree/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(shape(response.data), [
+            ('Home', [('Food', []), ('Rent', [])]),
+            ('Travel', [('Groceries', [('Produce', [])])]),
+        ])
+
+
+class OrganizationCashFlowTests(APITestCase):
+    """An organization's cash flow report shows no member's private accounts or balances."""
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.now().date()
+        cls.alice = User.objects.create_user(username='alice', password='testpass123')
+        cls.bob = User.objects.create_user(username='bob', password='testpass123')
+        cls.organization = Organization.objects.create(name='Shared Org', owner=cls.alice)
+        for member in (cls.alice, cls.bob):
+            OrganizationMember.objects.create(organization=cls.organization, user=member, role='admin')
+
+        cls.alice_account = Account.objects.create(user=cls.alice, title='A business', type='checking')
+        cls.bob_account = Account.objects.create(user=cls.bob, title='B private savings', type='savings')
+        # Bob's salary is personal, only the expense he paid for the organization is shared
+        Transaction.objects.create(
+            user=cls.bob, account=cls.bob_account, title='Salary', amount=Decimal('60000.00'), type='incoming',
+            transaction_date=today - timedelta(days=60)
+        )
+        Transaction.objects.create(
+            user=cls.bob, account=cls.bob_account, organization=cls.organization, title='Supplies',
+            amount=Decimal('1000.00'), type='outgoing', transaction_date=today - timedelta(days=2)
+        )
+        Transaction.objects.create(
+            user=cls.alice, account=cls.alice_account, organization=cls.organization, title='Invoice',
+            amount=Decimal('500.00'), type='incoming', transaction_date=today - timedelta(days=1)
+        )
+        cls.report = FinancialReport.objects.create(
+            user=cls.alice, organization=cls.organization, title='Org cash flow', report_type='cash_flow',
+            start_date=today - timedelta(days=30), end_date=today
+        )
+
+    def test_member_accounts_stay_private(self):
+        data = build_report(self.report, self.alice)
+
+        self.assertEqual([account['title'] for account in data['accounts']], ['A business'])
+        self.assertEqual(data['starting_balance'], Decimal('0.00'))
+        self.assertEqual(
+            [(point['inflow'], point['outflow'], point['balance']) for point in data['cash_flow']],
+            [(Decimal('0.00'), Decimal('1000.00'), Decimal('-1000.00')),
+             (Decimal('500.00'), Decimal('0.00'), Decimal('-500.00'))]
+        )
+        self.assertNotIn('B private savings', str(data))
+        self.assertNotIn('59000', str(data))
+
+        # Each member sees only their own account broken down
+        bob_data = build_report(self.report, self.bob)
+        self.assertEqual([account['title'] for account in bob_data['accounts']], ['B private savings'])
+        self.assertEqual(bob_data['accounts'][0]['starting_balance'], Decimal('0.00'))
+        self.assertEqual(bob_data['ending_balance'], data['ending_balance'])
+
+
+class RendererTests(APITestCase):
+    """orjson and MessagePack rendering, and the renderer benchmark's equivalence check."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='renderer', password='testpass123')
+        account = Account.objects.create(user=cls.user, title='Checking', type='checking')
+        Transaction.objects.create(
+            user=cls.user, account=account, title='Coffee', amount=Decimal('3.10'), type='outgoing'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_orjson_renders_decimals_as_exact_strings(self):
+        data = {'amount': Decimal('0.10'), 'large': Decimal('12345678901234567890.01'), 'nested': [Decimal('-1.5')]}
+        self.assertEqual(
+            json.loads(ORJSONRenderer().render(data)),
+            {'amount': '0.10', 'large': '12345678901234567890.01', 'nested': ['-1.5']}
+        )
+
+    def test_orjson_renders_dates_and_times_like_the_stock_renderer(self):
+        data = {
+            'aware': datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+            'naive': datetime(2024, 1, 2, 3, 4, 5),
+            'day': date(2024, 1, 2),
+            'time': time(3, 4, 5, 678901),
+        }
+        rendered = json.loads(ORJSONRenderer().render(data))
+        self.assertEqual(rendered, json.loads(JSONRenderer().render(data)))
+        self.assertEqual(rendered['aware'], '2024-01-02T03:04:05.678901Z')
+
+    @skipUnless(msgpack_available(), 'msgpack is not installed')
+    def test_msgpack_is_negotiated_from_accept(self):
+        response = self.client.get('/api/transactions/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+
+        as_json = json.loads(self.client.get('/api/transactions/').content)
+        self.assertEqual(msgpack.unpackb(response.content), as_json)
+        self.assertEqual(as_json['results'][0]['amount'], '3.10')
+
+    @skipIf(msgpack_available(), 'msgpack is installed')
+    def test_msgpack_is_not_offered_without_the_package(self):
+        response = self.client.get('/api/transactions/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, 406)
+
+    def test_benchmark_checks_equivalence(self):
+        out = StringIO()
+        call_command('benchmark_renderers', size=20, repeat=1, stdout=out)
+        self.assertIn('Rendered values match', out.getvalue())
+
+        with mock.patch.object(ORJSONRenderer, 'render', return_value=b'{}'), self.assertRaises(CommandError):
+            call_command('benchmark_renderers', size=20, repeat=1, stdout=StringIO())
@@ -1,12 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CategoryViewSet, TransactionViewSet, BudgetViewSet, FinancialReportViewSet
+from .views import CategoryViewSet, TransactionViewSet, BudgetViewSet, FinancialReportViewSet, ReportJobViewSet
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet)
 router.register(r'transactions', TransactionViewSet)
 router.register(r'budgets', BudgetViewSet)
 router.register(r'reports', FinancialReportViewSet)
+router.register(r'report-jobs', ReportJobViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
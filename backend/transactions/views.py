@@ -2,25 +2,42 @@ from django.shortcuts import render, get_object_or_404
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.parsers import MultiPartParser, FormParser
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Sum, Q
+from django.db.models import Sum, Count
 from django.utils import timezone
-from datetime import timedelta
-import csv
-from django.http import HttpResponse
-import json
+from django.http import StreamingHttpResponse
 
-from .models import Category, Transaction, Budget, FinancialReport
+from .models import Category, Transaction, TransactionTag, Budget, FinancialReport, ReportJob
+from .rollups import rollups_for
+from .budgets import resolve_spent
+from .categories import build_tree, spend_by_ancestor
+from . import exports
+from .reports import ReportError
+from .report_cache import get_or_build_report
+from .jobs import enqueue_report
+from .pagination import TransactionCursorPagination
+from .search import FullTextSearchFilter
+from .filters import TransactionFilter
+from .imports import import_transactions, ImportFileError
+from dashboard.analytics import bucket_start
+from dashboard.caching import ConditionalGetMixin, cached_response
+from accounts.models import Account
+from organizations.models import Organization
+from organizations.memberships import is_member
+from organizations.visibility import organization_ids_for, visible_to
 from .serializers import (
     CategorySerializer,
     TransactionSerializer,
+    TransactionListSerializer,
     TransactionDetailSerializer,
     BudgetSerializer,
     BudgetDetailSerializer,
-    FinancialReportSerializer
+    FinancialReportSerializer,
+    ReportJobSerializer
 )
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -31,40 +48,70 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         # Return user's personal categories and categories from their organizations
-        return Category.objects.filter(
-            Q(user=user) | 
-            Q(organization__members=user)
-        ).distinct()
+        return visible_to(Category.objects.all(), user)
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+    
+    @action(detail=False, methods=['get'])
+    @cached_response
+    def tree(self, request):
+        # One query for every visible category, nested in memory
+        categories = self.filter_queryset(self.get_queryset()).order_by('name').values(
+            'id', 'name', 'icon', 'color', 'organization', 'is_business_expense', 'is_tax_deductible', 'parent'
+        )
+        return Response(build_tree(categories))
+
+# Columns behind TransactionListSerializer, with the related names it reads
+LIST_FIELDS = (
+    'id', 'title', 'amount', 'type', 'timestamp', 'transaction_date', 'status', 'receipt',
+    'is_recurring', 'recurrence_type', 'recurrence_end_date', 'reference_number', 'tags',
+    'destination_account', 'category', 'category__name', 'account', 'account__title',
+    'organization', 'organization__name', 'project', 'project__name',
+)
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Transaction.objects.all()
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['account', 'type', 'category', 'status', 'organization', 'project', 'is_recurring']
+    etag_exclude_actions = ('export',)
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
+    filterset_class = TransactionFilter
     search_fields = ['title', 'description', 'tags']
     ordering_fields = ['amount', 'timestamp', 'transaction_date']
+    pagination_class = TransactionCursorPagination
     
     def get_queryset(self):
         user = self.request.user
         # Return user's personal transactions and transactions from their organizations
-        return Transaction.objects.filter(
-            Q(user=user) | 
-            Q(organization__members=user)
-        ).distinct()
+        transactions = visible_to(Transaction.objects.all(), user).select_related(
+            'category', 'account', 'organization', 'project'
+        )
+        if self.action == 'retrieve':
+            return transactions.select_related('destination_account')
+        if self.action == 'list':
+            # Only the columns TransactionListSerializer renders
+            return transactions.only(*LIST_FIELDS)
+        return transactions
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return TransactionDetailSerializer
+        if self.action == 'list':
+            return TransactionListSerializer
         return TransactionSerializer
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
     
+    def perform_content_negotiation(self, request, force=False):
+        # export reads ?format= itself, so don't 404 on formats DRF has no renderer for
+        if self.action == 'export':
+            force = True
+        return super().perform_content_negotiation(request, force)
+    
     @action(detail=False, methods=['get'])
+    @cached_response
     def summary(self, request):
         user = request.user
         
@@ -75,54 +122,52 @@ class TransactionViewSet(viewsets.ModelViewSet):
         
         # Calculate date range
         today = timezone.now().date()
-        if period == 'week':
-            start_date = today - timedelta(days=today.weekday())
-        elif period == 'month':
-            start_date = today.replace(day=1)
-        elif period == 'quarter':
-            month = ((today.month - 1) // 3) * 3 + 1
-            start_date = today.replace(month=month, day=1)
-        elif period == 'year':
-            start_date = today.replace(month=1, day=1)
+        if period in ('week', 'month', 'quarter', 'year'):
+            start_date = bucket_start(today, period)
         else:  # all time
             start_date = None
         
-        # Base queryset
-        transactions = Transaction.objects.filter(
-            Q(user=user) | 
-            Q(organization__members=user)
-        )
+        # Base querysets, totals come from the daily rollup
+        organization_ids = organization_ids_for(user)
+        transactions = visible_to(Transaction.objects.all(), user, organization_ids)
+        summary_rollups = rollups_for(user, include_organizations=True, organization_ids=organization_ids)
         
         # Apply date filter if needed
         if start_date:
             transactions = transactions.filter(transaction_date__gte=start_date)
+            summary_rollups = summary_rollups.filter(date__gte=start_date)
         
         # Apply organization filter if needed
         if organization_id:
             transactions = transactions.filter(organization_id=organization_id)
+            summary_rollups = summary_rollups.filter(organization_id=organization_id)
         
         # Apply project filter if needed
         if project_id:
             transactions = transactions.filter(project_id=project_id)
+            summary_rollups = summary_rollups.filter(project_id=project_id)
         
         # Calculate income, expenses, and balance
-        income = transactions.filter(type='incoming', status='completed').aggregate(
-            total=Sum('amount')
-        )['total'] or 0
-        
-        expenses = transactions.filter(type='outgoing', status='completed').aggregate(
-            total=Sum('amount')
-        )['total'] or 0
-        
-        # Get top categories for expenses
-        top_expense_categories = transactions.filter(
-            type='outgoing', 
-            status='completed'
-        ).values(
-            'category__name'
-        ).annotate(
-            total=Sum('amount')
-        ).order_by('-total')[:5]
+        totals = summary_rollups.aggregate(
+            income=Sum('income'),
+            expenses=Sum('expenses')
+        )
+        income = totals['income'] or 0
+        expenses = totals['expenses'] or 0
+        
+        # Get top categories for expenses, optionally rolled up to top-level categories
+        if request.query_params.get('rollup_categories') in ('true', '1'):
+            top_expense_categories = spend_by_ancestor(
+                summary_rollups.filter(expenses__gt=0), amount='expenses', top_level=True
+            )[:5]
+        else:
+            top_expense_categories = summary_rollups.filter(
+                expenses__gt=0
+            ).values(
+                'category__name'
+            ).annotate(
+                total=Sum('expenses')
+            ).order_by('-total')[:5]
         
         # Get recent transactions
         recent_transactions = transactions.order_by('-transaction_date')[:5]
@@ -139,6 +184,50 @@ class TransactionViewSet(viewsets.ModelViewSet):
             'end_date': today
         })
     
+    @action(detail=False, methods=['get'])
+    @cached_response
+    def spend_by_tag(self, request):
+        start_date = request.query_params.get('start_date')
+        end_date = request.query_params.get('end_date')
+        organization_id = request.query_params.get('organization')
+        project_id = request.query_params.get('project')
+        
+        # Completed expenses the user can see, filtered like the summary
+        transactions = visible_to(Transaction.objects.all(), request.user).filter(
+            status='completed',
+            type='outgoing'
+        )
+        if start_date:
+            transactions = transactions.filter(transaction_date__gte=start_date)
+        if end_date:
+            transactions = transactions.filter(transaction_date__lte=end_date)
+        if organization_id:
+            transactions = transactions.filter(organization_id=organization_id)
+        if project_id:
+            transactions = transactions.filter(project_id=project_id)
+        
+        # One grouped query over the tag links of the matching transactions
+        spend = TransactionTag.objects.filter(
+            transaction__in=transactions.values('id')
+        ).values(
+            'tag__name'
+        ).annotate(
+            total=Sum('transaction__amount'),
+            count=Count('transaction_id')
+        ).order_by('-total', 'tag__name')
+        
+        return Response({
+            'tags': [
+                {
+                    'tag': row['tag__name'],
+                    'total': row['total'],
+                    'count': row['count']
+                } for row in spend
+            ],
+            'start_date': start_date,
+            'end_date': end_date
+        })
+    
     @action(detail=False, methods=['get'])
     def export(self, request):
         user = request.user
@@ -149,10 +238,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
         format_type = request.query_params.get('format', 'csv')
         
         # Base queryset
-        transactions = Transaction.objects.filter(
-            Q(user=user) | 
-            Q(organization__members=user)
-        )
+        transactions = visible_to(Transaction.objects.all(), user)
         
         # Apply date filters if provided
         if start_date:
@@ -163,39 +249,67 @@ class TransactionViewSet(viewsets.ModelViewSet):
         # Order by date
         transactions = transactions.order_by('transaction_date')
         
-        if format_type == 'csv':
-            # Create CSV response
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = 'attachment; filename="transactions.csv"'
-            
-            writer = csv.writer(response)
-            writer.writerow([
-                'Date', 'Title', 'Amount', 'Type', 'Category', 
-                'Account', 'Status', 'Description', 'Organization', 
-                'Project', 'Reference'
-            ])
-            
-            for transaction in transactions:
-                writer.writerow([
-                    transaction.transaction_date,
-                    transaction.title,
-                    transaction.amount,
-                    transaction.get_type_display(),
-                    transaction.category.name if transaction.category else '',
-                    transaction.account.title,
-                    transaction.get_status_display(),
-                    transaction.description,
-                    transaction.organization.name if transaction.organization else '',
-                    transaction.project.name if transaction.project else '',
-                    transaction.reference_number or ''
-                ])
+        if format_type in exports.STREAM_FORMATS:
+            if format_type in ('parquet', 'arrow') and not exports.columnar_available():
+                return Response(
+                    {'detail': 'Parquet and Arrow exports require pyarrow to be installed.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             
+            # Stream the export so rows reach the client as they are read
+            stream, content_type, extension = exports.STREAM_FORMATS[format_type]
+            response = StreamingHttpResponse(stream(transactions), content_type=content_type)
+            response['Content-Disposition'] = f'attachment; filename="transactions.{extension}"'
             return response
         else:
             # Return JSON
+            transactions = transactions.select_related('category', 'account', 'organization', 'project')
             return Response(TransactionSerializer(transactions, many=True).data)
 
-class BudgetViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser, FormParser])
+    def import_file(self, request):
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response(
+                {'detail': 'A CSV or OFX file is required.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        account = Account.objects.filter(pk=request.data.get('account'), user=request.user).first()
+        if not account:
+            return Response(
+                {'detail': 'A valid account is required.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        organization = None
+        organization_id = request.data.get('organization')
+        if organization_id:
+            organization = Organization.objects.filter(pk=organization_id).first() if is_member(request.user, organization_id) else None
+            if not organization:
+                return Response(
+                    {'detail': 'You are not a member of this organization.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        # Infer the format from the file name unless given
+        file_format = request.data.get('file_format')
+        if not file_format:
+            file_format = 'ofx' if upload.name.lower().endswith(('.ofx', '.qfx')) else 'csv'
+        if file_format not in ('csv', 'ofx'):
+            return Response(
+                {'detail': 'file_format must be csv or ofx.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            result = import_transactions(upload, file_format, request.user, account, organization)
+        except ImportFileError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(result, status=status.HTTP_201_CREATED if result['imported'] else status.HTTP_200_OK)
+
+class BudgetViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Budget.objects.all()
     serializer_class = BudgetSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -207,10 +321,7 @@ class BudgetViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         # Return user's personal budgets and budgets from their organizations
-        return Budget.objects.filter(
-            Q(user=user) | 
-            Q(organization__members=user)
-        ).distinct()
+        return visible_to(Budget.objects.all(), user).select_related('category', 'organization', 'project')
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -221,6 +332,7 @@ class BudgetViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
     
     @action(detail=False, methods=['get'])
+    @cached_response
     def summary(self, request):
         user = request.user
         
@@ -229,10 +341,7 @@ class BudgetViewSet(viewsets.ModelViewSet):
         project_id = request.query_params.get('project')
         
         # Base queryset
-        budgets = Budget.objects.filter(
-            Q(user=user) | 
-            Q(organization__members=user)
-        )
+        budgets = visible_to(Budget.objects.all(), user).select_related('category', 'organization', 'project')
         
         # Apply organization filter if needed
         if organization_id:
@@ -242,6 +351,9 @@ class BudgetViewSet(viewsets.ModelViewSet):
         if project_id:
             budgets = budgets.filter(project_id=project_id)
         
+        # Resolve current-period spend for all budgets in one query
+        budgets = resolve_spent(budgets)
+        
         # Calculate budget statistics
         total_budget = sum(budget.amount for budget in budgets)
         total_spent = sum(budget.spent for budget in budgets)
@@ -269,223 +381,52 @@ class FinancialReportViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         # Return user's personal reports and reports from their organizations
-        return FinancialReport.objects.filter(
-            Q(user=user) | 
-            Q(organization__members=user)
-        ).distinct()
+        return visible_to(FinancialReport.objects.all(), user).select_related('organization')
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
     
-    @action(detail=True, methods=['get'])
+    @action(detail=True, methods=['get', 'post'])
     def generate(self, request, pk=None):
         report = self.get_object()
-        user = request.user
         
-        # Get report parameters
-        start_date = report.start_date
-        end_date = report.end_date
-        report_type = report.report_type
-        organization = report.organization
-        
-        # Base queryset for transactions
-        transactions = Transaction.objects.filter(
-            Q(user=user) | 
-            Q(organization__members=user)
-        ).filter(
-            transaction_date__gte=start_date,
-            transaction_date__lte=end_date
-        )
-        
-        # Apply organization filter if needed
-        if organization:
-            transactions = transactions.filter(organization=organization)
-        
-        # Generate different reports based on type
-        if report_type == 'income_statement':
-            # Income statement report
-            income = transactions.filter(type='incoming', status='completed').aggregate(
-                total=Sum('amount')
-            )['total'] or 0
-            
-            expenses = transactions.filter(type='outgoing', status='completed').aggregate(
-                total=Sum('amount')
-            )['total'] or 0
-            
-            # Get expenses by category
-            expenses_by_category = transactions.filter(
-                type='outgoing', 
-                status='completed'
-            ).values(
-                'category__name'
-            ).annotate(
-                total=Sum('amount')
-            ).order_by('-total')
-            
-            report_data = {
-                'income': income,
-                'expenses': expenses,
-                'net_income': income - expenses,
-                'expenses_by_category': list(expenses_by_category)
-            }
-            
-        elif report_type == 'expense_report':
-            # Expense report
-            expenses = transactions.filter(type='outgoing', status='completed')
-            
-            # Get expenses by category
-            expenses_by_category = expenses.values(
-                'category__name'
-            ).annotate(
-                total=Sum('amount')
-            ).order_by('-total')
-            
-            # Get expenses by date
-            expenses_by_date = expenses.values(
-                'transaction_date'
-            ).annotate(
-                total=Sum('amount')
-            ).order_by('transaction_date')
-            
-            report_data = {
-                'total_expenses': expenses.aggregate(total=Sum('amount'))['total'] or 0,
-                'expenses_by_category': list(expenses_by_category),
-                'expenses_by_date': list(expenses_by_date),
-                'transactions': TransactionSerializer(expenses, many=True).data
-            }
-            
-        elif report_type == 'cash_flow':
-            # Cash flow report
-            transactions_by_date = transactions.filter(
-                status='completed'
-            ).values(
-                'transaction_date', 'type'
-            ).annotate(
-                total=Sum('amount')
-            ).order_by('transaction_date')
-            
-            # Process data for cash flow
-            cash_flow_data = []
-            balance = 0
-            
-            for entry in transactions_by_date:
-                if entry['type'] == 'incoming':
-                    balance += entry['total']
-                else:
-                    balance -= entry['total']
-                
-                cash_flow_data.append({
-                    'date': entry['transaction_date'],
-                    'type': entry['type'],
-                    'amount': entry['total'],
-                    'balance': balance
-                })
-            
-            report_data = {
-                'cash_flow': cash_flow_data,
-                'starting_balance': 0,  # Would need to calculate actual starting balance
-                'ending_balance': balance
-            }
-            
-        elif report_type == 'budget_analysis':
-            # Budget analysis report
-            budgets = Budget.objects.filter(
-                Q(user=user) | 
-                Q(organization__members=user)
-            )
-            
-            if organization:
-                budgets = budgets.filter(organization=organization)
-            
-            budget_data = []
-            
-            for budget in budgets:
-                budget_data.append({
-                    'title': budget.title,
-                    'amount': budget.amount,
-                    'spent': budget.spent,
-                    'remaining': budget.remaining,
-                    'percentage_used': budget.percentage_used,
-                    'category': budget.category.name if budget.category else None,
-                    'period': budget.get_period_display()
-                })
-            
-            report_data = {
-                'budgets': budget_data,
-                'total_budget': sum(b.amount for b in budgets),
-                'total_spent': sum(b.spent for b in budgets),
-                'total_remaining': sum(b.remaining for b in budgets)
-            }
-            
-        elif report_type == 'project_finance':
-            # Project finance report
-            project_id = report.parameters.get('project_id')
-            
-            if not project_id:
-                return Response(
-                    {'detail': 'Project ID is required for project finance report.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Filter transactions for the project
-            project_transactions = transactions.filter(project_id=project_id)
-            
-            # Calculate income and expenses
-            income = project_transactions.filter(type='incoming', status='completed').aggregate(
-                total=Sum('amount')
-            )['total'] or 0
-            
-            expenses = project_transactions.filter(type='outgoing', status='completed').aggregate(
-                total=Sum('amount')
-            )['total'] or 0
-            
-            # Get project budget
-            from organizations.models import Project
-            project = get_object_or_404(Project, id=project_id)
-            
-            report_data = {
-                'project': {
-                    'id': project.id,
-                    'name': project.name,
-                    'budget': project.budget,
-                    'budget_spent': project.budget_spent,
-                    'budget_remaining': project.budget_remaining,
-                    'budget_percentage': project.budget_percentage
-                },
-                'income': income,
-                'expenses': expenses,
-                'net': income - expenses,
-                'transactions': TransactionSerializer(project_transactions, many=True).data
-            }
-            
-        elif report_type == 'tax_report':
-            # Tax report
-            tax_deductible_expenses = transactions.filter(
-                type='outgoing',
-                status='completed',
-                category__is_tax_deductible=True
-            )
-            
-            # Group by category
-            expenses_by_category = tax_deductible_expenses.values(
-                'category__name'
-            ).annotate(
-                total=Sum('amount')
-            ).order_by('-total')
-            
-            report_data = {
-                'total_tax_deductible': tax_deductible_expenses.aggregate(total=Sum('amount'))['total'] or 0,
-                'expenses_by_category': list(expenses_by_category),
-                'transactions': TransactionSerializer(tax_deductible_expenses, many=True).data
-            }
-            
-        else:
-            report_data = {
-                'error': 'Unsupported report type'
-            }
+        # POST queues the report for the background worker instead of computing it here
+        if request.method == 'POST':
+            job = enqueue_report(report, request.user)
+            return Response(ReportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
         
-        # Save report data to parameters
-        report.parameters = report_data
-        report.save()
+        # parameters are the report's inputs, so the output is only cached, never stored on the report
+        try:
+            report_data, cached = get_or_build_report(report, request.user)
+        except ReportError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response(report_data)
+
+class ReportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = ReportJob.objects.all()
+    serializer_class = ReportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['report', 'status']
+    
+    def get_queryset(self):
+        return ReportJob.objects.filter(
+            user=self.request.user
+        ).select_related('report').defer('result').order_by('-created_at')
+    
+    @action(detail=True, methods=['get'])
+    def result(self, request, pk=None):
+        job = get_object_or_404(ReportJob, pk=pk, user=request.user)
+        
+        if job.status == 'completed':
+            return Response(job.result)
+        
+        if job.status == 'failed':
+            return Response(
+                {'detail': job.error or 'Report generation failed.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Still queued or running
+        return Response(ReportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)